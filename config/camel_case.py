@@ -0,0 +1,165 @@
+"""
+Рендерер и парсеры camelCase с кешированием перевода ключей.
+
+djangorestframework_camel_case прогоняет регулярное выражение по каждому
+ключу каждого объекта ответа и тела запроса, а для каждого скалярного
+значения проверяет итерируемость через исключение. Набор ключей API мал,
+поэтому их перевод кешируется в ограниченном LRU-кеше (ключи тел запросов
+приходят от клиентов, неограниченный кеш рос бы без предела), а скаляры
+отдаются без проверок. Результат совпадает с функциями библиотеки.
+"""
+
+import json
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files import File
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case import util
+from djangorestframework_camel_case.settings import api_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+KEY_CACHE_SIZE = 4096
+# значения, которые возвращаются как есть без проверки итерируемости
+SCALAR_TYPES = frozenset({str, int, float, bool, type(None), Decimal})
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def camelize_key(key: str) -> str:
+    if "_" not in key:
+        return key
+    return re.sub(util.camelize_re, util.underscore_to_camel, key)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _underscoreize_key(key: str, no_underscore_before_number: bool) -> str:
+    return util.camel_to_underscore(
+        key, no_underscore_before_number=no_underscore_before_number
+    )
+
+
+def underscore_key(key: str) -> str:
+    """Ключ в snake_case с настройками JSON_UNDERSCOREIZE (например, из ?fields=)"""
+    return _underscoreize_key(
+        key, bool(api_settings.JSON_UNDERSCOREIZE.get("no_underscore_before_number"))
+    )
+
+
+def camelize(data, **options):
+    """Аналог djangorestframework_camel_case.util.camelize с кешем ключей"""
+    ignore_fields = options.get("ignore_fields") or ()
+    ignore_keys = options.get("ignore_keys") or ()
+    return _camelize(data, ignore_fields, ignore_keys)
+
+
+def _camelize(data, ignore_fields, ignore_keys):
+    if type(data) in SCALAR_TYPES:
+        return data
+    if isinstance(data, Promise):
+        data = force_str(data)
+    if isinstance(data, dict):
+        if isinstance(data, ReturnDict):
+            new_dict = ReturnDict(serializer=data.serializer)
+        else:
+            new_dict = {}
+        for key, value in data.items():
+            if isinstance(key, Promise):
+                key = force_str(key)
+            new_key = camelize_key(key) if isinstance(key, str) else key
+            if ignore_fields and (key in ignore_fields or new_key in ignore_fields):
+                result = value
+            else:
+                result = _camelize(value, ignore_fields, ignore_keys)
+            if ignore_keys and (key in ignore_keys or new_key in ignore_keys):
+                new_dict[key] = result
+            else:
+                new_dict[new_key] = result
+        return new_dict
+    if isinstance(data, (list, tuple)) or (
+        not isinstance(data, str) and util.is_iterable(data)
+    ):
+        return [_camelize(item, ignore_fields, ignore_keys) for item in data]
+    return data
+
+
+def underscoreize(data, **options):
+    """
+    Аналог djangorestframework_camel_case.util.underscoreize с кешем ключей.
+    Данные форм (QueryDict, MultiValueDict) редки и невелики, их по-прежнему
+    обрабатывает библиотека
+    """
+    ignore_fields = options.get("ignore_fields") or ()
+    ignore_keys = options.get("ignore_keys") or ()
+    flag = bool(options.get("no_underscore_before_number"))
+    return _underscoreize(data, flag, ignore_fields, ignore_keys, options)
+
+
+def _underscoreize(data, flag, ignore_fields, ignore_keys, options):
+    if type(data) in SCALAR_TYPES:
+        return data
+    if isinstance(data, (QueryDict, MultiValueDict)):
+        return util.underscoreize(data, **options)
+    if isinstance(data, dict):
+        new_dict = {}
+        for key, value in data.items():
+            new_key = _underscoreize_key(key, flag) if isinstance(key, str) else key
+            if ignore_fields and (key in ignore_fields or new_key in ignore_fields):
+                result = value
+            else:
+                result = _underscoreize(
+                    value, flag, ignore_fields, ignore_keys, options
+                )
+            if ignore_keys and (key in ignore_keys or new_key in ignore_keys):
+                new_dict[key] = result
+            else:
+                new_dict[new_key] = result
+        return new_dict
+    if isinstance(data, list) or (
+        not isinstance(data, (str, File)) and util.is_iterable(data)
+    ):
+        return [
+            _underscoreize(item, flag, ignore_fields, ignore_keys, options)
+            for item in data
+        ]
+    return data
+
+
+class CamelCaseJSONRenderer(api_settings.RENDERER_CLASS):
+    """Замена djangorestframework_camel_case.render.CamelCaseJSONRenderer"""
+
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def render(self, data, *args, **kwargs):
+        return super().render(
+            camelize(data, **self.json_underscoreize), *args, **kwargs
+        )
+
+
+class CamelCaseBrowsableAPIRenderer(BrowsableAPIRenderer):
+    def render(self, data, *args, **kwargs):
+        return super().render(
+            camelize(data, **api_settings.JSON_UNDERSCOREIZE), *args, **kwargs
+        )
+
+
+class CamelCaseJSONParser(api_settings.PARSER_CLASS):
+    """Замена djangorestframework_camel_case.parser.CamelCaseJSONParser"""
+
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read().decode(encoding)
+            return underscoreize(json.loads(data), **self.json_underscoreize)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
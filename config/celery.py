@@ -0,0 +1,13 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = Celery("config")
+
+# настройки Celery берутся из settings с префиксом CELERY_
+app.config_from_object("django.conf:settings", namespace="CELERY")
+
+# задачи из модулей tasks.py установленных приложений
+app.autodiscover_tasks()
@@ -0,0 +1,97 @@
+"""
+Рендереры и парсер на orjson и MessagePack с ключами в camelCase.
+
+Обе библиотеки входят в основные зависимости; в окружении без них классы
+остаются импортируемыми, но в REST_FRAMEWORK не подключаются (см. settings).
+Ответ по умолчанию — CamelCaseJSONRenderer на стандартном json; orjson выбирается заголовком
+Accept: application/json; engine=orjson, MessagePack — заголовком
+Accept: application/x-msgpack.
+
+Значения, которые библиотеки не сериализуют сами (Decimal, даты и время,
+ленивые строки), преобразуются так же, как в JSONEncoder DRF, поэтому
+orjson отдаёт те же байты, что и рендерер по умолчанию.
+"""
+
+from django.conf import settings
+from djangorestframework_camel_case.settings import api_settings
+from phonenumber_field.phonenumber import PhoneNumber
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from config.camel_case import camelize, underscoreize
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """Значения вне типов JSON: номера телефонов строкой E.164, остальное — как в DRF"""
+    if isinstance(obj, PhoneNumber):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class CamelCaseORJSONRenderer(BaseRenderer):
+    media_type = "application/json; engine=orjson"
+    format = "orjson"
+    charset = None
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(
+            camelize(data, **self.json_underscoreize),
+            default=encode_default,
+            # даты и время отдаются JSONEncoder DRF (миллисекунды, Z для UTC)
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+
+class CamelCaseORJSONParser(BaseParser):
+    """Разбор тел application/json через orjson с переводом ключей в snake_case"""
+
+    media_type = "application/json"
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        data = stream.read()
+        if encoding.lower().replace("-", "") != "utf8":
+            data = data.decode(encoding)
+        try:
+            return underscoreize(orjson.loads(data), **self.json_underscoreize)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class CamelCaseMessagePackRenderer(BaseRenderer):
+    """MessagePack для внутренних сервисов: те же ключи и значения, что в JSON"""
+
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(
+            camelize(data, **self.json_underscoreize),
+            default=encode_default,
+            use_bin_type=True,
+        )
@@ -1,6 +1,7 @@
 import os
 import sys
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -40,19 +41,35 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
-    "DEFAULT_RENDERER_CLASSES": (
-        "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
-        "djangorestframework_camel_case.render.CamelCaseBrowsableAPIRenderer",
-    ),
-    "DEFAULT_PARSER_CLASSES": (
-        "djangorestframework_camel_case.parser.CamelCaseJSONParser",
-    ),
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.camel_case.CamelCaseJSONRenderer",
+        "config.camel_case.CamelCaseBrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.camel_case.CamelCaseJSONParser",
+    ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# orjson и MessagePack (см. config/renderers.py) входят в основные зависимости;
+# проверка оставлена для окружений без них. Рендерер orjson
+# стоит первым: он выбирается только по Accept с параметром engine=orjson,
+# а обычный application/json по-прежнему отдаёт CamelCaseJSONRenderer
+if find_spec("orjson"):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(
+        0, "config.renderers.CamelCaseORJSONRenderer"
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(
+        0, "config.renderers.CamelCaseORJSONParser"
+    )
+if find_spec("msgpack"):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append(
+        "config.renderers.CamelCaseMessagePackRenderer"
+    )
+
 SPECTACULAR_SETTINGS = {
     # Включаем преобразование имен в camelCase
     "CAMELIZE_NAMES": True,
@@ -170,10 +187,20 @@ if CACHE_ENABLED:
             "LOCATION": os.getenv("LOCATION"),
         }
     }
+else:
+    # без общего кеша кеширование выключено: кеш в памяти процесса не видел бы
+    # сбросов из других воркеров, команд и Celery и отдавал бы устаревшие ответы
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # утверждения пользователя в access-токене (см. users/authentication.py)
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.ClaimsTokenRefreshSerializer",
+    "TOKEN_USER_CLASS": "users.authentication.ClaimsUser",
 }
 
 AUTH_USER_MODEL = "users.User"
@@ -205,13 +232,13 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 
 # Настройки для Celery beat
-# CELERY_BEAT_SCHEDULE = {
-#     "task-name": {
-#         "task": "myapp.tasks.task_name",
-#         "schedule": timedelta(minutes=1),
-# "schedule": crontab(hour=8, minute=0),  # Ежедневно в 8:00 утра
-# },
-# }
+CELERY_BEAT_SCHEDULE = {
+    # повторы отложенных писем и письма, чей проход потерялся
+    "drain-outbox": {
+        "task": "users.tasks.drain_outbox_task",
+        "schedule": timedelta(minutes=1),
+    },
+}
 
 
 # Разрешаем CORS для localhost на разных портах
@@ -250,6 +277,9 @@ if "test" in sys.argv:
     EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
     CELERY_TASK_ALWAYS_EAGER = True  # Выполнять задачи синхронно
     CELERY_TASK_EAGER_PROPAGATES = True  # Пропускать ошибки из задач
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
@@ -1,8 +1,53 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 
+from network_nodes.cache import get_cached_facets, invalidate_network_cache
 from network_nodes.models import NetworkNode
+from network_nodes.search import search_nodes
+
+
+class CityFacetFilter(admin.SimpleListFilter):
+    """
+    Фильтр по городу; города с разным написанием объединены по ключу.
+    Варианты берутся из закешированных агрегатов, если они есть, иначе —
+    списком пар (ключ, город) без группировки, как для фасетов
+    """
+
+    title = "город"
+    parameter_name = "city_key"
+
+    def lookups(self, request, model_admin):
+        facets = get_cached_facets()
+        if facets is not None:
+            rows = [(row["city_key"], row["city"]) for row in facets]
+        else:
+            rows = (
+                NetworkNode.objects.exclude(city_key="")
+                .values_list("city_key", "city")
+                .distinct()
+                .order_by()
+            )
+        cities = {}
+        for key, city in rows:
+            if key:
+                cities[key] = min(cities.get(key, city), city)
+        return sorted(cities.items(), key=lambda item: item[1])
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(city_key=self.value())
+        return queryset
+
+
+class NetworkNodeChangeList(ChangeList):
+    def get_ordering(self, request, queryset):
+        # результаты поиска сортируем по релевантности, если сортировка не выбрана
+        if self.query.strip() and ORDER_VAR not in self.params:
+            return ["-search_rank", "-pk"]
+        return super().get_ordering(request, queryset)
 
 
 @admin.register(NetworkNode)
@@ -19,11 +64,20 @@ class NetworkNodeAdmin(admin.ModelAdmin):
         "created_at",
         "level",
     )
-    list_filter = ("city",)
+    list_filter = (CityFacetFilter,)
     search_fields = ("name", "city", "country")
     ordering = ("id", "-created_at")
     readonly_fields = ("created_at", "level", "supplier_link")
 
+    def get_search_results(self, request, queryset, search_term):
+        # индексированный поиск вместо icontains по search_fields
+        if not search_term.strip():
+            return queryset, False
+        return search_nodes(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return NetworkNodeChangeList
+
     @admin.display(description="Поставщик")
     def supplier_link(self, obj):
         if obj.supplier:
@@ -39,7 +93,9 @@ class NetworkNodeAdmin(admin.ModelAdmin):
     # Admin action для обнуления задолженности
     @admin.action(description="Очистить задолженность перед поставщиком")
     def clear_debt(self, request, queryset):
-        updated = queryset.update(debt_to_supplier=0)
+        updated = queryset.update(debt_to_supplier=0, updated_at=timezone.now())
+        # массовое обновление не вызывает сигналов
+        invalidate_network_cache()
         self.message_user(request, f"Задолженность очищена у {updated} объектов.")
 
     actions = [clear_debt]
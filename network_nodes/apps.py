@@ -5,3 +5,7 @@ class NetworkNodesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "network_nodes"
     verbose_name = "Network_nodes"
+
+    def ready(self):
+        # регистрация обработчиков сигналов
+        from network_nodes import signals  # noqa: F401
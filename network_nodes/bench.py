@@ -0,0 +1,286 @@
+import statistics
+import time
+import tracemalloc
+import uuid
+from itertools import count
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from djangorestframework_camel_case import util
+from djangorestframework_camel_case.render import (
+    CamelCaseJSONRenderer as LibraryCamelCaseJSONRenderer,
+)
+from djangorestframework_camel_case.settings import api_settings
+from rest_framework.test import APIClient
+
+from config.camel_case import CamelCaseJSONRenderer, camelize, underscoreize
+from network_nodes.cache import bump_generation
+from network_nodes.models import NetworkNode
+from network_nodes.readers import NetworkNodeReader
+from network_nodes.serializers import NetworkNodeSerializer
+from users import outbox
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password-123"
+LIST_PAGE_SIZES = (10, 50, 100)
+# метрики, рост которых сверх порога считается регрессией
+COMPARED_METRICS = ("p50_ms", "p95_ms", "queries", "memory_kib")
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    ordered = sorted(values)
+    index = max(0, round(share * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class BenchClient:
+    """
+    Клиент DRF с JWT сотрудника. Email создаваемых объектов уникальны
+    в пределах запуска за счёт метки запуска и счётчика
+    """
+
+    def __init__(self):
+        from users.models import User
+
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        User.objects.create_user(
+            email=BENCH_EMAIL, password=BENCH_PASSWORD, is_active=True, is_staff=True
+        )
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        response = self.anonymous.post(
+            "/users/login/",
+            {"email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+            format="json",
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.counter = count(1)
+        self.run = uuid.uuid4().hex[:8]
+        self.node_ids = list(
+            NetworkNode.objects.order_by("id").values_list("id", flat=True)[:1000]
+        )
+        self.supplier_id = (
+            NetworkNode.objects.filter(node_type=NetworkNode.FACTORY)
+            .values_list("id", flat=True)
+            .first()
+        )
+
+    def node_id(self) -> int:
+        return self.node_ids[next(self.counter) % len(self.node_ids)]
+
+
+def list_scenario(page_size):
+    def run(bench):
+        return bench.client.get(f"/network-nodes/?page_size={page_size}")
+
+    return run
+
+
+def retrieve(bench):
+    return bench.client.get(f"/network-nodes/{bench.node_id()}/")
+
+
+def create(bench):
+    number = next(bench.counter)
+    return bench.client.post(
+        "/network-nodes/create/",
+        {
+            "name": f"Bench node {number}",
+            "nodeType": NetworkNode.RETAIL,
+            "email": f"bench-{bench.run}-{number}@example.com",
+            "country": "Россия",
+            "city": "Москва",
+            "houseNumber": "1",
+            "supplier": bench.supplier_id,
+        },
+        format="json",
+    )
+
+
+def update(bench):
+    return bench.client.patch(
+        f"/network-nodes/update/{bench.node_id()}/",
+        {"city": f"Город {next(bench.counter)}"},
+        format="json",
+    )
+
+
+def login(bench):
+    return bench.anonymous.post(
+        "/users/login/",
+        {"email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+        format="json",
+    )
+
+
+def register(bench):
+    return bench.anonymous.post(
+        "/users/register/",
+        {
+            "email": f"bench-user-{bench.run}-{next(bench.counter)}@example.com",
+            "password": "password123",
+        },
+        format="json",
+    )
+
+
+SCENARIOS = {
+    **{f"list_{size}": list_scenario(size) for size in LIST_PAGE_SIZES},
+    "retrieve": retrieve,
+    "create": create,
+    "update": update,
+    "login": login,
+    "register": register,
+}
+
+
+def measure(bench: BenchClient, scenario, iterations: int, warmup: int) -> dict:
+    """
+    Прогоняет сценарий: сначала замер времени без накладных расходов
+    трассировки, затем отдельный проход с подсчётом запросов и памяти.
+    Перед каждым вызовом поколение кеша ответов увеличивается вне замера,
+    чтобы измерялись запросы к БД и сериализация, а не попадание в кеш
+    """
+    for _ in range(warmup):
+        bump_generation()
+        scenario(bench)
+
+    timings = []
+    for _ in range(iterations):
+        bump_generation()
+        started = time.perf_counter()
+        response = scenario(bench)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"Сценарий вернул {response.status_code}: {response.data}"
+            )
+
+    queries = []
+    memory = []
+    for _ in range(max(1, iterations // 10)):
+        bump_generation()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as context:
+            scenario(bench)
+        memory.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        queries.append(len(context.captured_queries))
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 0.5), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "queries": max(queries),
+        "memory_kib": round(max(memory), 1),
+    }
+
+
+def _p50(path, iterations: int) -> float:
+    path()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        path()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(percentile(timings, 0.5), 3)
+
+
+def measure_serialization(rows: int = 100, iterations: int = 20) -> dict:
+    """
+    Сравнивает сериализацию страницы звеньев с продуктами сериализатором DRF
+    и через NetworkNodeReader: время от запроса к БД до списка словарей
+    """
+    queryset = (
+        NetworkNode.objects.select_related("supplier")
+        .prefetch_related("products")
+        .order_by("id")[:rows]
+    )
+    reader = NetworkNodeReader(NetworkNodeSerializer)
+
+    def serializer_path():
+        return NetworkNodeSerializer(list(queryset), many=True).data
+
+    def reader_path():
+        return reader.to_representation(reader.project(queryset))
+
+    result = {
+        "rows": rows,
+        "iterations": iterations,
+        "serializer_p50_ms": _p50(serializer_path, iterations),
+        "reader_p50_ms": _p50(reader_path, iterations),
+    }
+    result["speedup"] = round(result["serializer_p50_ms"] / result["reader_p50_ms"], 2)
+    return result
+
+
+def measure_camel_case(rows: int = 1000, iterations: int = 20) -> dict:
+    """
+    Сравнивает рендеринг большого списка звеньев с продуктами и обратный
+    перевод ключей тела запроса: djangorestframework_camel_case
+    и config.camel_case с кешем ключей. Результаты обязаны совпадать
+    """
+    reader = NetworkNodeReader(NetworkNodeSerializer)
+    data = reader.to_representation(
+        reader.project(NetworkNode.objects.order_by("id")[:rows])
+    )
+    options = api_settings.JSON_UNDERSCOREIZE
+    payload = camelize(data, **options)
+    library_renderer = LibraryCamelCaseJSONRenderer()
+    renderer = CamelCaseJSONRenderer()
+    if library_renderer.render(data) != renderer.render(data):
+        raise RuntimeError("Рендереры camelCase дают разный результат")
+    if util.underscoreize(payload, **options) != underscoreize(payload, **options):
+        raise RuntimeError("Парсеры camelCase дают разный результат")
+
+    render_library = _p50(lambda: library_renderer.render(data), iterations)
+    render_cached = _p50(lambda: renderer.render(data), iterations)
+    parse_library = _p50(lambda: util.underscoreize(payload, **options), iterations)
+    parse_cached = _p50(lambda: underscoreize(payload, **options), iterations)
+    return {
+        "rows": len(data),
+        "iterations": iterations,
+        "render_library_p50_ms": render_library,
+        "render_cached_p50_ms": render_cached,
+        "render_speedup": round(render_library / render_cached, 2),
+        "parse_library_p50_ms": parse_library,
+        "parse_cached_p50_ms": parse_cached,
+        "parse_speedup": round(parse_library / parse_cached, 2),
+    }
+
+
+def run_benchmarks(names, iterations: int = 50, warmup: int = 5) -> dict:
+    # регистрация ставит письмо в очередь, но не публикует задачу отправки:
+    # ожидание брокера и его повторы не должны попадать в задержку
+    with mock.patch.object(outbox, "schedule_drain", lambda: None):
+        bench = BenchClient()
+        return {
+            name: measure(bench, SCENARIOS[name], iterations, warmup) for name in names
+        }
+
+
+def compare_results(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Сравнивает результаты с базовыми и возвращает описания регрессий:
+    метрик, выросших больше чем на threshold (доля, 0.2 = 20%)
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base.get(metric), metrics[metric]
+            if old is None:
+                continue
+            if metric == "queries":
+                # количество запросов детерминировано, рост недопустим
+                regressed = new > old
+            else:
+                regressed = new > old * (1 + threshold)
+            if regressed:
+                regressions.append(f"{name}.{metric}: {old} -> {new}")
+    return regressions
@@ -0,0 +1,174 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from users.permissions import IsActiveEmployee
+
+# агрегаты по поддеревьям заводов и розничных сетей
+ROLLUP_CACHE_KEY = "network_nodes:rollup"
+ROLLUP_CACHE_TIMEOUT = 60 * 60
+
+# количество звеньев и задолженность по странам и городам
+FACETS_CACHE_KEY = "network_nodes:facets"
+# изменения отдельных звеньев обновляют закешированные группы на месте; параллельные
+# обновления из разных процессов могут потерять правку, срок хранения её ограничивает
+FACETS_CACHE_TIMEOUT = 15 * 60
+
+# кеш ответов API: поколение входит в ключ, поэтому при любом изменении
+# звеньев или продуктов достаточно увеличить его, старые ключи истекут сами
+GENERATION_CACHE_KEY = "network_nodes:generation"
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+HITS_CACHE_KEY = "network_nodes:response_hits"
+MISSES_CACHE_KEY = "network_nodes:response_misses"
+
+
+def get_cached_rollup():
+    return cache.get(ROLLUP_CACHE_KEY)
+
+
+def set_cached_rollup(rollup) -> None:
+    cache.set(ROLLUP_CACHE_KEY, rollup, ROLLUP_CACHE_TIMEOUT)
+
+
+def invalidate_rollup() -> None:
+    cache.delete(ROLLUP_CACHE_KEY)
+
+
+def get_cached_facets():
+    return cache.get(FACETS_CACHE_KEY)
+
+
+def set_cached_facets(facets) -> None:
+    cache.set(FACETS_CACHE_KEY, facets, FACETS_CACHE_TIMEOUT)
+
+
+def invalidate_facets() -> None:
+    cache.delete(FACETS_CACHE_KEY)
+
+
+def get_generation() -> int:
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, _new_generation(), None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def bump_generation() -> None:
+    """
+    Делает недействительными все закешированные ответы API звеньев. Внутри
+    транзакции поколение увеличивается ещё раз после фиксации: ответы,
+    закешированные до неё по старым данным, не должны пережить изменение.
+    """
+    _increment_generation()
+    if connection.in_atomic_block:
+        transaction.on_commit(_increment_generation)
+
+
+def _increment_generation() -> None:
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        # счётчик вытеснен из кеша: начинаем с заведомо нового значения,
+        # чтобы не совпасть с поколением ещё живых ключей
+        cache.set(GENERATION_CACHE_KEY, _new_generation(), None)
+
+
+def _new_generation() -> int:
+    return time.time_ns() // 1000
+
+
+def invalidate_network_cache() -> None:
+    """
+    Сбрасывает агрегаты поддеревьев, по странам и городам и кеш ответов
+    после массового изменения звеньев
+    """
+    invalidate_rollup()
+    invalidate_facets()
+    bump_generation()
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_response_cache_stats() -> dict:
+    values = cache.get_many([HITS_CACHE_KEY, MISSES_CACHE_KEY])
+    hits = values.get(HITS_CACHE_KEY, 0)
+    misses = values.get(MISSES_CACHE_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0,
+        "generation": get_generation(),
+    }
+
+
+def caller_permission(request) -> str:
+    """
+    Класс разрешения, по которому вызывающий получил доступ. Представления
+    допускают сотрудников или администраторов, проверка сотрудника не требует
+    запросов к БД, поэтому остальные вызывающие — администраторы.
+    """
+    if IsActiveEmployee().has_permission(request, None):
+        return IsActiveEmployee.__name__
+    return "IsAdmin"
+
+
+def response_cache_key(request, view) -> str:
+    params = sorted(request.query_params.lists())
+    # ETag ответа зависит от формата, поэтому форматы кешируются раздельно
+    raw = (
+        f"{request.get_host()}|{request.path}|{params}|"
+        f"{request.accepted_media_type}|{caller_permission(request)}"
+    )
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return f"network_nodes:response:{get_generation()}:{type(view).__name__}:{digest}"
+
+
+class ResponseCacheMixin:
+    """
+    Кеширует данные успешных GET-ответов представления вместе с заголовками
+    ETag и Last-Modified, поэтому попадание в кеш, в том числе с ответом
+    304 Not Modified, не требует запросов к БД. Разрешения проверяются до
+    обработчика, поэтому из кеша отдаются только прошедшим проверку.
+    Заголовок X-Cache показывает, был ли ответ взят из кеша.
+    """
+
+    response_cache_timeout = RESPONSE_CACHE_TIMEOUT
+    cached_headers = ("ETag", "Last-Modified")
+
+    def get(self, request, *args, **kwargs):
+        key = response_cache_key(request, self)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(HITS_CACHE_KEY)
+            data, headers = cached
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+            ) or Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            response["X-Cache"] = "HIT"
+            return response
+
+        _count(MISSES_CACHE_KEY)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                name: response[name] for name in self.cached_headers if name in response
+            }
+            cache.set(key, (response.data, headers), self.response_cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,102 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, state: str) -> str:
+    raw = f"{request.get_full_path()}|{request.accepted_media_type}|{state}"
+    return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Условный GET: ETag и Last-Modified считаются агрегатным запросом по
+    времени изменения звеньев без сериализации. Если они совпадают
+    с If-None-Match или If-Modified-Since, возвращается 304 Not Modified.
+
+    Время изменения звена обновляется и при изменении его продуктов или
+    названия поставщика, поэтому продукты и поставщиков отдельно не учитываем.
+    Разрешения проверяются до обработчика, до 304 доходят только прошедшие.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        """Возвращает состояние выборки (строка для ETag) и время последнего изменения"""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        state, last_modified = validators
+        etag = make_etag(request, state)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+
+class ListConditionalGetMixin:
+    """
+    Условный GET списка: ETag строится по отданной странице (id и время
+    изменения её звеньев, ссылки пагинации и количество в постраничном
+    режиме), поэтому агрегата по всей выборке, а с ним и COUNT, от которого
+    избавляет курсорная пагинация, нет. 304 экономит передачу ответа, но не
+    чтение страницы; без запросов к БД повторы обслуживает кеш ответов.
+
+    Колонки состояния добавляются к строкам, которые читает FastReadMixin.
+    Last-Modified не отдаётся: удаление звена не меняет время изменения
+    остальных, и дата дала бы устаревший 304.
+    """
+
+    state_columns = ("id", "updated_at")
+
+    def get_extra_columns(self) -> list[str]:
+        return [*super().get_extra_columns(), *self.state_columns]
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self._page_state = [
+                tuple(row[column] for column in self.state_columns) for row in page
+            ]
+        return page
+
+    def get(self, request, *args, **kwargs):
+        self._page_state = None
+        response = super().get(request, *args, **kwargs)
+        if response.status_code != 200 or self._page_state is None:
+            return response
+
+        envelope = sorted(
+            (key, value) for key, value in response.data.items() if key != "results"
+        )
+        etag = make_etag(request, f"{self._page_state}|{envelope}")
+        response = get_conditional_response(request, etag=etag) or response
+        response["ETag"] = etag
+        return response
+
+
+class RetrieveConditionalGetMixin(ConditionalGetMixin):
+    def get_validators(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        model = self.get_queryset().model
+        updated_at = next(
+            iter(
+                model._default_manager.filter(**lookup).values_list(
+                    "updated_at", flat=True
+                )[:1]
+            ),
+            None,
+        )
+        if updated_at is None:
+            # звено не найдено: ответ 404 сформирует обычный обработчик
+            return None
+        return updated_at.isoformat(), updated_at
@@ -0,0 +1,52 @@
+import csv
+import json
+
+from djangorestframework_camel_case.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from config.camel_case import camelize
+
+# количество строк, которое ORM забирает из курсора за раз
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку вместо хранения"""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset, serializer):
+    for node in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield camelize(
+            serializer.to_representation(node), **api_settings.JSON_UNDERSCOREIZE
+        )
+
+
+def stream_ndjson(queryset, serializer):
+    """По одному JSON-объекту на строку; в памяти одновременно только одна пачка"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for row in _rows(queryset, serializer):
+        yield encoder.encode(row) + "\n"
+
+
+def stream_csv(queryset, serializer):
+    """
+    CSV с заголовком; вложенные продукты записываются JSON-строкой. Поля,
+    которых нет в строке (supplierName у завода), остаются пустыми
+    """
+    header = list(
+        camelize(
+            {name: None for name in serializer.fields},
+            **api_settings.JSON_UNDERSCOREIZE,
+        )
+    )
+    writer = csv.DictWriter(Echo(), fieldnames=header, restval="")
+    yield writer.writeheader()
+    for row in _rows(queryset, serializer):
+        if "products" in row:
+            row["products"] = json.dumps(
+                row["products"], cls=JSONEncoder, ensure_ascii=False
+            )
+        yield writer.writerow(row)
@@ -1,13 +1,79 @@
 import django_filters
 
+from network_nodes import locations
 from network_nodes.models import NetworkNode
+from network_nodes.search import search_nodes
+
+
+def country_filter_value(value: str) -> str:
+    # неизвестная страна не должна совпадать со звеньями с пустым кодом
+    return locations.country_code(value) or value.strip().upper()
+
+
+class NormalizedFilter(django_filters.CharFilter):
+    """Точный фильтр по нормализованной колонке: значение нормализуется так же"""
+
+    def __init__(self, *args, normalize, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.normalize = normalize
+
+    def filter(self, qs, value):
+        if value:
+            value = self.normalize(value)
+        return super().filter(qs, value)
+
+
+class NormalizedInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Фильтр по списку значений через запятую (?country_code__in=RU,KZ,BY)"""
+
+    def __init__(self, *args, normalize, **kwargs):
+        kwargs.setdefault("lookup_expr", "in")
+        super().__init__(*args, **kwargs)
+        self.normalize = normalize
+
+    def filter(self, qs, value):
+        if value:
+            value = [self.normalize(item) for item in value]
+        return super().filter(qs, value)
 
 
 class NetworkNodeFilter(django_filters.FilterSet):
     country = django_filters.CharFilter(
         lookup_expr="icontains", label="Страна (поиск по части названия)"
     )
+    country_code = NormalizedFilter(
+        normalize=country_filter_value,
+        label="Страна: код ISO 3166-1 (RU) или название (Россия)",
+    )
+    country_code__in = NormalizedInFilter(
+        field_name="country_code",
+        normalize=country_filter_value,
+        label="Страны через запятую: коды ISO 3166-1 или названия",
+    )
+    city_key = NormalizedFilter(
+        normalize=locations.city_key,
+        label="Город (точное совпадение без учёта регистра)",
+    )
+    city_key__in = NormalizedInFilter(
+        field_name="city_key",
+        normalize=locations.city_key,
+        label="Города через запятую (точное совпадение без учёта регистра)",
+    )
+    search = django_filters.CharFilter(
+        method="filter_search",
+        label="Поиск по названию, городу и стране (по релевантности)",
+    )
 
     class Meta:
         model = NetworkNode
-        fields = ["country"]
+        fields = [
+            "country",
+            "country_code",
+            "country_code__in",
+            "city_key",
+            "city_key__in",
+            "search",
+        ]
+
+    def filter_search(self, queryset, name, value):
+        return search_nodes(queryset, value)
@@ -0,0 +1,347 @@
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+from datetime import date
+
+from django.db import connection, transaction
+from djangorestframework_camel_case.settings import api_settings
+
+from config.camel_case import underscoreize
+from network_nodes.cache import bump_generation, invalidate_network_cache
+from network_nodes.models import PATH_SEPARATOR, NetworkNode, Product
+from network_nodes.serializers import NetworkNodeBatchItemSerializer
+from network_nodes.services import MAX_LEVEL, touch_nodes, upsert_product_rows
+
+
+def read_rows(path: str, skip: int = 0):
+    """
+    Потоково читает CSV (по расширению .csv) или NDJSON и отдаёт пары
+    (номер строки данных, словарь). Ключи приводятся к snake_case,
+    первые skip строк данных пропускаются (возобновление импорта).
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for number, row in enumerate(rows, start=1):
+            if number <= skip:
+                continue
+            yield number, underscoreize(row, **api_settings.JSON_UNDERSCOREIZE)
+
+
+REF_FIELDS = ("ref", "supplier_ref", "node_ref")
+
+
+def _clean(row: dict) -> dict:
+    """
+    Пустые значения CSV считаем отсутствующими, внешние ссылки приводим
+    к строкам: в NDJSON они могут быть числами
+    """
+    row = {
+        key: value
+        for key, value in row.items()
+        if key and value is not None and value != ""
+    }
+    for field in REF_FIELDS:
+        if field in row:
+            row[field] = str(row[field])
+    return row
+
+
+class ImportCheckpoint:
+    """
+    Контрольная точка импорта: сколько строк каждого файла уже записано
+    и строки, ожидающие своего поставщика (JSON-файл, перезаписывается
+    атомарно после каждой зафиксированной пачки), а также соответствие
+    внешних ссылок звеньев их id. Ссылок столько же, сколько звеньев,
+    поэтому они дописываются в отдельный NDJSON-файл только для новой пачки,
+    а не переписываются целиком.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.refs_path = f"{path}.refs"
+        self.state = {"nodes_line": 0, "products_line": 0, "pending": []}
+        # ref -> [id, level, path] уже записанных звеньев
+        self.refs = {}
+        # без --resume прежний журнал ссылок очищается при первой записи
+        self._refs_mode = "w"
+
+    def load(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                self.state.update(json.load(file))
+        # контрольные точки прежнего формата хранили ссылки в самом файле
+        self.refs.update(self.state.pop("refs", {}))
+        if os.path.exists(self.refs_path):
+            with open(self.refs_path, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        ref, *node = json.loads(line)
+                        self.refs[ref] = node
+        self._refs_mode = "a"
+
+    def add_refs(self, refs: dict) -> None:
+        """Дописывает ссылки новой пачки в журнал ссылок"""
+        self.refs.update(refs)
+        with open(self.refs_path, self._refs_mode, encoding="utf-8") as file:
+            for ref, node in refs.items():
+                file.write(json.dumps([ref, *node], ensure_ascii=False) + "\n")
+        self._refs_mode = "a"
+
+    def save(self) -> None:
+        if self._refs_mode == "w":
+            self.add_refs({})
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.state, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class NodeImporter:
+    """
+    Импорт звеньев сети пачками.
+
+    Строка ссылается на поставщика через supplier_ref — внешнюю ссылку (ref)
+    другой строки. Если поставщик ещё не встречался, строка откладывается до
+    его появления. Уровни и пути вычисляются в памяти, а пачка записывается
+    через bulk_create по одному слою иерархии за раз.
+    """
+
+    def __init__(self, checkpoint: ImportCheckpoint, batch_size: int):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.refs = checkpoint.refs
+        self.pending = defaultdict(list)
+        for line, row in checkpoint.state["pending"]:
+            self.pending[row["supplier_ref"]].append((line, row))
+        self.buffer = {}
+        self.created = 0
+        self.rejected = 0
+        self.line = checkpoint.state["nodes_line"]
+
+    def add(self, line: int, row: dict) -> None:
+        self.line = line
+        self._add(line, _clean(row))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def _add(self, line: int, row: dict) -> None:
+        ref = row.pop("ref", None)
+        supplier_ref = row.pop("supplier_ref", None)
+        key = ref or f"#{line}"
+        if ref and (ref in self.refs or ref in self.buffer):
+            self.rejected += 1
+            return
+
+        if supplier_ref is None:
+            level = 0
+        elif supplier_ref in self.refs:
+            level = self.refs[supplier_ref][1] + 1
+        elif supplier_ref in self.buffer:
+            level = self.buffer[supplier_ref][1] + 1
+        else:
+            row.update(ref=ref, supplier_ref=supplier_ref)
+            self.pending[supplier_ref].append((line, row))
+            return
+
+        serializer = NetworkNodeBatchItemSerializer(data=row)
+        if (
+            not serializer.is_valid()
+            or level > MAX_LEVEL
+            or (level and serializer.validated_data["node_type"] == NetworkNode.FACTORY)
+        ):
+            self.rejected += 1
+            self._reject_pending(ref)
+            return
+
+        self.buffer[key] = (serializer.validated_data, level, supplier_ref)
+        if ref:
+            for child_line, child in self.pending.pop(ref, []):
+                self._add(child_line, child)
+
+    def _reject_pending(self, ref) -> None:
+        for _, child in self.pending.pop(ref, []):
+            self.rejected += 1
+            self._reject_pending(child.get("ref"))
+
+    def _reject_duplicate_phones(self) -> None:
+        phones = {}
+        duplicates = set()
+        for key, (data, level, supplier_ref) in self.buffer.items():
+            if data.get("phone"):
+                phone = data["phone"].as_e164
+                if phone in phones:
+                    duplicates.add(key)
+                else:
+                    phones[phone] = key
+        taken = NetworkNode.objects.filter(phone__in=list(phones)).values_list(
+            "phone", flat=True
+        )
+        duplicates.update(phones[phone.as_e164] for phone in taken)
+        # вместе со звеном отклоняются и его потомки из той же пачки
+        for key in sorted(duplicates, key=lambda k: self.buffer[k][1]):
+            self._drop_from_buffer(key)
+
+    def _drop_from_buffer(self, key) -> None:
+        if self.buffer.pop(key, None) is None:
+            return
+        self.rejected += 1
+        children = [k for k, item in self.buffer.items() if item[2] == key]
+        for child in children:
+            self._drop_from_buffer(child)
+
+    def flush(self) -> None:
+        new_refs = {}
+        with transaction.atomic():
+            self._reject_duplicate_phones()
+            for level in sorted({item[1] for item in self.buffer.values()}):
+                layer = []
+                for key, (data, item_level, supplier_ref) in self.buffer.items():
+                    if item_level != level:
+                        continue
+                    data = {
+                        field: value
+                        for field, value in data.items()
+                        if field not in ("temp_id", "supplier_temp_id", "supplier")
+                    }
+                    node = NetworkNode(**data, level=level)
+                    if supplier_ref is None:
+                        node.path = PATH_SEPARATOR
+                    else:
+                        supplier_id, _, supplier_path = self.refs[supplier_ref]
+                        node.supplier_id = supplier_id
+                        node.path = f"{supplier_path}{supplier_id}{PATH_SEPARATOR}"
+                    layer.append((key, node))
+                NetworkNode.objects.bulk_create(
+                    [node for _, node in layer], batch_size=1000
+                )
+                for key, node in layer:
+                    if not key.startswith("#"):
+                        new_refs[key] = [node.pk, node.level, node.path]
+                # следующий слой ссылается на поставщиков из этого
+                self.refs.update(new_refs)
+                self.created += len(layer)
+        self.buffer = {}
+        invalidate_network_cache()
+        self.checkpoint.add_refs(new_refs)
+        self.checkpoint.state["nodes_line"] = self.line
+        self.checkpoint.state["pending"] = [
+            item for rows in self.pending.values() for item in rows
+        ]
+        self.checkpoint.save()
+
+    def finish(self) -> None:
+        self.flush()
+        # поставщики этих строк так и не встретились в файле
+        self.rejected += sum(len(rows) for rows in self.pending.values())
+        self.pending.clear()
+        self.checkpoint.state["pending"] = []
+        self.checkpoint.save()
+
+
+class ProductImporter:
+    """
+    Импорт продуктов пачками по ключу unique_product_per_node.
+
+    Звено задаётся внешней ссылкой node_ref из файла звеньев или id
+    существующего звена (network_node). В PostgreSQL пачка загружается
+    через COPY во временную таблицу и переносится одним
+    INSERT ... ON CONFLICT DO UPDATE, в остальных СУБД —
+    через bulk_create(update_conflicts=True).
+    """
+
+    def __init__(self, checkpoint: ImportCheckpoint, batch_size: int):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.refs = checkpoint.refs
+        self.buffer = {}
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.line = checkpoint.state["products_line"]
+
+    def add(self, line: int, row: dict) -> None:
+        self.line = line
+        row = _clean(row)
+        try:
+            if "node_ref" in row:
+                node_id = self.refs[row["node_ref"]][0]
+            else:
+                node_id = int(row["network_node"])
+            name, model = row["name"].strip(), row["model"].strip()
+            release_date = date.fromisoformat(row["release_date"])
+        except (KeyError, ValueError, TypeError, AttributeError):
+            self.rejected += 1
+        else:
+            if name and model and len(name) <= 255 and len(model) <= 255:
+                self.buffer[(node_id, name, model)] = release_date
+            else:
+                self.rejected += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        node_ids = {key[0] for key in self.buffer}
+        existing = set(
+            NetworkNode.objects.filter(pk__in=node_ids).values_list("pk", flat=True)
+        )
+        rows = {key: value for key, value in self.buffer.items() if key[0] in existing}
+        self.rejected += len(self.buffer) - len(rows)
+        if rows:
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    inserted, updated = copy_merge_products(rows)
+                    touch_nodes(existing)
+                else:
+                    inserted, updated = upsert_product_rows(rows)
+            bump_generation()
+            self.inserted += inserted
+            self.updated += updated
+        self.buffer = {}
+        self.checkpoint.state["products_line"] = self.line
+        self.checkpoint.save()
+
+
+def copy_merge_products(rows: dict) -> tuple[int, int]:
+    """
+    COPY пачки продуктов во временную таблицу и перенос в основную одним
+    INSERT ... ON CONFLICT DO UPDATE (только PostgreSQL, внутри транзакции).
+    Возвращает количество вставленных и обновлённых продуктов.
+    """
+    table = connection.ops.quote_name(Product._meta.db_table)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for (node_id, name, model), release_date in rows.items():
+        writer.writerow([node_id, name, model, release_date.isoformat()])
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS product_import_staging ("
+            "network_node_id bigint, name varchar(255), model varchar(255), "
+            "release_date date) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(
+            "COPY product_import_staging (network_node_id, name, model, release_date) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            f"WITH upserted AS ("
+            f"INSERT INTO {table} "
+            f"(network_node_id, name, model, release_date, updated_at) "
+            f"SELECT network_node_id, name, model, release_date, now() "
+            f"FROM product_import_staging "
+            f"ON CONFLICT (network_node_id, name, model) "
+            f"DO UPDATE SET release_date = EXCLUDED.release_date, "
+            f"updated_at = EXCLUDED.updated_at "
+            f"RETURNING (xmax = 0) AS inserted) "
+            f"SELECT COUNT(*) FILTER (WHERE inserted), "
+            f"COUNT(*) FILTER (WHERE NOT inserted) FROM upserted"
+        )
+        inserted, updated = cursor.fetchone()
+    return inserted, updated
@@ -0,0 +1,261 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from network_nodes.bench import percentile
+
+# Границы корзин гистограммы задержек, мс
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+DEFAULT_MIX = {"list": 6, "retrieve": 3, "update": 1, "login": 0}
+
+
+def parse_mix(value: str) -> dict:
+    """Разбирает смесь запросов вида "list=6,retrieve=3,update=1" """
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Неизвестный тип запроса: {name}")
+        mix[name] = int(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("Хотя бы один тип запроса должен иметь ненулевой вес")
+    return mix
+
+
+class HTTPConnection:
+    """
+    Минимальный асинхронный клиент HTTP/1.1 с keep-alive поверх одного
+    TCP-соединения. Переподключается, если сервер закрыл соединение
+    (например, синхронные воркеры gunicorn отвечают с Connection: close).
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body=None, token=None):
+        """Отправляет запрос и возвращает статус и разобранное JSON-тело"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            "Accept: application/json",
+            f"Content-Length: {len(payload)}",
+        ]
+        if body is not None:
+            headers.append("Content-Type: application/json")
+        if token:
+            headers.append(f"Authorization: Bearer {token}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        await self.writer.drain()
+
+        try:
+            status, response_headers, data = await self._read_response()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            await self.close()
+            raise
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, json.loads(data) if data else None
+
+    async def _read_response(self):
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b"".join(chunks)
+        elif "content-length" in headers:
+            data = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            # тело до закрытия соединения
+            data = await self.reader.read()
+            headers["connection"] = "close"
+        return status, headers, data
+
+
+class LoadTest:
+    """
+    Нагрузочный прогон: connections параллельных клиентов с keep-alive
+    выполняют запросы в заданной смеси в течение duration секунд
+    или до общего количества requests
+    """
+
+    def __init__(
+        self,
+        url: str,
+        email: str,
+        password: str,
+        mix: dict,
+        connections: int = 10,
+        duration: float = 10,
+        requests: int | None = None,
+        seed: int | None = None,
+    ):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.credentials = {"email": email, "password": password}
+        self.mix = mix
+        self.connections = connections
+        self.duration = duration
+        self.requests = requests
+        self.random = random.Random(seed)
+        self.token = None
+        self.node_ids = []
+        self.latencies = {name: [] for name in mix}
+        self.statuses = {name: Counter() for name in mix}
+        self.sent = 0
+
+    async def login(self, connection: HTTPConnection) -> int:
+        status, data = await connection.request(
+            "POST", f"{self.prefix}/users/login/", self.credentials
+        )
+        if status == 200:
+            self.token = data["access"]
+        return status
+
+    async def prepare(self) -> None:
+        """Получает токен и id звеньев для запросов к отдельным звеньям"""
+        connection = HTTPConnection(self.host, self.port)
+        try:
+            if await self.login(connection) != 200:
+                raise RuntimeError("Не удалось войти с указанными учётными данными")
+            status, data = await connection.request(
+                "GET", f"{self.prefix}/network-nodes/?page_size=100", token=self.token
+            )
+        finally:
+            await connection.close()
+        if status != 200:
+            raise RuntimeError(f"Список звеньев вернул статус {status}")
+        self.node_ids = [node["id"] for node in data["results"]]
+        if not self.node_ids and (self.mix.get("retrieve") or self.mix.get("update")):
+            raise RuntimeError("В базе нет звеньев, заполните её командой fill_db")
+
+    def _next_request(self):
+        kind = self.random.choices(list(self.mix), list(self.mix.values()))[0]
+        if kind == "list":
+            return kind, "GET", f"{self.prefix}/network-nodes/", None
+        if kind == "login":
+            return kind, "POST", f"{self.prefix}/users/login/", self.credentials
+        node_id = self.random.choice(self.node_ids)
+        if kind == "retrieve":
+            return kind, "GET", f"{self.prefix}/network-nodes/{node_id}/", None
+        body = {"street": f"Нагрузочная {self.random.randint(1, 1000)}"}
+        return kind, "PATCH", f"{self.prefix}/network-nodes/update/{node_id}/", body
+
+    def _has_budget(self, deadline: float) -> bool:
+        if self.requests is not None:
+            return self.sent < self.requests
+        return time.monotonic() < deadline
+
+    async def worker(self, deadline: float) -> None:
+        connection = HTTPConnection(self.host, self.port)
+        try:
+            while self._has_budget(deadline):
+                self.sent += 1
+                kind, method, path, body = self._next_request()
+                started = time.perf_counter()
+                try:
+                    status, _ = await connection.request(method, path, body, self.token)
+                    if status == 401 and kind != "login":
+                        # срок действия токена истёк
+                        await self.login(connection)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    status = "error"
+                    await connection.close()
+                self.latencies[kind].append((time.perf_counter() - started) * 1000)
+                self.statuses[kind][status] += 1
+        finally:
+            await connection.close()
+
+    async def run(self) -> dict:
+        await self.prepare()
+        started = time.monotonic()
+        deadline = started + self.duration
+        await asyncio.gather(*(self.worker(deadline) for _ in range(self.connections)))
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed: float) -> dict:
+        scenarios = {}
+        for kind, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            statuses = self.statuses[kind]
+            errors = sum(
+                count
+                for status, count in statuses.items()
+                if status == "error" or status >= 400
+            )
+            scenarios[kind] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 1),
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": {str(status): count for status, count in statuses.items()},
+                "p50_ms": round(percentile(latencies, 0.5), 2),
+                "p90_ms": round(percentile(latencies, 0.9), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "max_ms": round(max(latencies), 2),
+                "histogram": histogram(latencies),
+            }
+        total = sum(item["requests"] for item in scenarios.values())
+        errors = sum(
+            item["error_rate"] * item["requests"] for item in scenarios.values()
+        )
+        return {
+            "connections": self.connections,
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1),
+            "error_rate": round(errors / total, 4) if total else 0,
+            "scenarios": scenarios,
+        }
+
+
+def histogram(latencies: list[float]) -> dict:
+    """Количество запросов по корзинам задержек: "<=N" мс и ">N" для хвоста"""
+    buckets = Counter()
+    for latency in latencies:
+        for bound in HISTOGRAM_BUCKETS:
+            if latency <= bound:
+                buckets[f"<={bound}"] += 1
+                break
+        else:
+            buckets[f">{HISTOGRAM_BUCKETS[-1]}"] += 1
+    labels = [f"<={bound}" for bound in HISTOGRAM_BUCKETS]
+    labels.append(f">{HISTOGRAM_BUCKETS[-1]}")
+    return {label: buckets[label] for label in labels if buckets[label]}
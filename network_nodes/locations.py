@@ -0,0 +1,84 @@
+"""
+Нормализация адресов звеньев сети для индексированных фильтров.
+
+Страна и город хранятся в свободной форме («Россия», «russia », «РФ»),
+поэтому рядом с ними хранятся нормализованные колонки: код страны
+ISO 3166-1 alpha-2 и ключ города (casefold, ё → е, схлопнутые пробелы).
+"""
+
+# ISO 3166-1 alpha-2 -> alpha-3 и распространённые названия (в casefold)
+COUNTRIES = {
+    "RU": (
+        "RUS",
+        "россия",
+        "российская федерация",
+        "рф",
+        "russia",
+        "russian federation",
+    ),
+    "BY": ("BLR", "беларусь", "белоруссия", "республика беларусь", "belarus"),
+    "KZ": ("KAZ", "казахстан", "республика казахстан", "kazakhstan"),
+    "UZ": ("UZB", "узбекистан", "uzbekistan"),
+    "KG": ("KGZ", "киргизия", "кыргызстан", "kyrgyzstan"),
+    "TJ": ("TJK", "таджикистан", "tajikistan"),
+    "TM": ("TKM", "туркменистан", "туркмения", "turkmenistan"),
+    "AM": ("ARM", "армения", "armenia"),
+    "AZ": ("AZE", "азербайджан", "azerbaijan"),
+    "GE": ("GEO", "грузия", "georgia"),
+    "MD": ("MDA", "молдова", "молдавия", "moldova"),
+    "UA": ("UKR", "украина", "ukraine"),
+    "MN": ("MNG", "монголия", "mongolia"),
+    "CN": ("CHN", "китай", "кнр", "china"),
+    "TW": ("TWN", "тайвань", "taiwan"),
+    "HK": ("HKG", "гонконг", "hong kong"),
+    "JP": ("JPN", "япония", "japan"),
+    "KR": ("KOR", "южная корея", "корея", "republic of korea", "south korea"),
+    "VN": ("VNM", "вьетнам", "vietnam", "viet nam"),
+    "IN": ("IND", "индия", "india"),
+    "TR": ("TUR", "турция", "turkey", "türkiye"),
+    "AE": (
+        "ARE",
+        "оаэ",
+        "объединённые арабские эмираты",
+        "united arab emirates",
+        "uae",
+    ),
+    "DE": ("DEU", "германия", "germany"),
+    "FI": ("FIN", "финляндия", "finland"),
+    "PL": ("POL", "польша", "poland"),
+    "US": (
+        "USA",
+        "сша",
+        "соединённые штаты",
+        "united states",
+        "united states of america",
+    ),
+}
+
+
+def _fold(value: str) -> str:
+    return " ".join(value.casefold().replace("ё", "е").split())
+
+
+_LOOKUP = {
+    _fold(alias): code
+    for code, aliases in COUNTRIES.items()
+    for alias in (code, *aliases)
+}
+
+
+def country_code(country: str | None) -> str:
+    """
+    Код ISO 3166-1 alpha-2 по названию или коду страны; пустая строка,
+    если страна неизвестна
+    """
+    if not country:
+        return ""
+    return _LOOKUP.get(_fold(country), "")
+
+
+def city_key(city: str | None) -> str:
+    """Ключ города для точного сравнения: «  Санкт-Петербург» и «санкт-петербург» совпадают"""
+    if not city:
+        return ""
+    return _fold(city)
@@ -0,0 +1,123 @@
+import json
+import logging
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from network_nodes.bench import (
+    SCENARIOS,
+    compare_results,
+    measure_camel_case,
+    measure_serialization,
+    run_benchmarks,
+)
+from network_nodes.management.commands.fill_db import fill_db
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет задержку, количество запросов и память основных сценариев API "
+        "на сгенерированных данных и сравнивает с базовыми результатами"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios",
+            nargs="+",
+            choices=list(SCENARIOS),
+            default=list(SCENARIOS),
+            help="Запускаемые сценарии",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--factories", type=int, default=20, help="Размер данных, см. fill_db"
+        )
+        parser.add_argument("--fanout", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--output", default="bench.json", help="Файл для результатов"
+        )
+        parser.add_argument("--baseline", help="Файл базовых результатов")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Допустимый рост метрик относительно базовых (0.2 = 20%%)",
+        )
+
+    def handle(self, *args, **options):
+        # Замеры выполняются в отдельной тестовой базе, рабочие данные не меняются
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            fill_db(
+                factories=options["factories"],
+                fanout=options["fanout"],
+                seed=options["seed"],
+            )
+            results = run_benchmarks(
+                options["scenarios"], options["iterations"], options["warmup"]
+            )
+            serialization = measure_serialization()
+            camel_case = measure_camel_case()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "factories": options["factories"],
+                "fanout": options["fanout"],
+                "iterations": options["iterations"],
+            },
+            "scenarios": results,
+            "serialization": serialization,
+            "camel_case": camel_case,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:<12} p50 {metrics['p50_ms']:>9.2f} мс  "
+                f"p95 {metrics['p95_ms']:>9.2f} мс  "
+                f"запросов {metrics['queries']:>3}  "
+                f"память {metrics['memory_kib']:>9.1f} КиБ"
+            )
+        self.stdout.write(
+            f"Сериализация {serialization['rows']} звеньев: "
+            f"DRF {serialization['serializer_p50_ms']:.2f} мс, "
+            f"values() {serialization['reader_p50_ms']:.2f} мс, "
+            f"ускорение x{serialization['speedup']}"
+        )
+        self.stdout.write(
+            f"camelCase {camel_case['rows']} звеньев: рендеринг "
+            f"{camel_case['render_library_p50_ms']:.2f} -> "
+            f"{camel_case['render_cached_p50_ms']:.2f} мс "
+            f"(x{camel_case['render_speedup']}), разбор "
+            f"{camel_case['parse_library_p50_ms']:.2f} -> "
+            f"{camel_case['parse_cached_p50_ms']:.2f} мс "
+            f"(x{camel_case['parse_speedup']})"
+        )
+        logger.info(f"Результаты сохранены в {options['output']}")
+
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)["scenarios"]
+            regressions = compare_results(results, baseline, options["threshold"])
+            if regressions:
+                raise CommandError(
+                    "Регрессия производительности:\n" + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("Регрессий не обнаружено"))
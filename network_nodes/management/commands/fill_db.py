@@ -1,111 +1,224 @@
 import logging
-from datetime import date
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
 
-from network_nodes.models import NetworkNode, Product
+from network_nodes.cache import invalidate_network_cache
+from network_nodes.models import PATH_SEPARATOR, NetworkNode, Product
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Страна -> (вес, города с весами): большая часть сети в России,
+# внутри страны звенья тяготеют к крупным городам
+COUNTRIES = {
+    "Россия": (
+        70,
+        {
+            "Москва": 30,
+            "Санкт-Петербург": 15,
+            "Новосибирск": 6,
+            "Екатеринбург": 6,
+            "Казань": 5,
+            "Нижний Новгород": 4,
+            "Краснодар": 4,
+            "Самара": 3,
+        },
+    ),
+    "Казахстан": (10, {"Алматы": 5, "Астана": 3, "Шымкент": 1}),
+    "Беларусь": (8, {"Минск": 6, "Гомель": 1, "Брест": 1}),
+    "Китай": (7, {"Шэньчжэнь": 4, "Шанхай": 3, "Гуанчжоу": 2}),
+    "Армения": (3, {"Ереван": 1}),
+    "Узбекистан": (2, {"Ташкент": 3, "Самарканд": 1}),
+}
+STREETS = (
+    "Ленина",
+    "Мира",
+    "Садовая",
+    "Промышленная",
+    "Заводская",
+    "Центральная",
+    "Торговая",
+    "Электрозаводская",
+    "Технологическая",
+)
+PRODUCTS = {
+    "Смартфон": ("X", "S", "Note"),
+    "Ноутбук": ("Pro", "Air", "Book"),
+    "Планшет": ("Mini", "Tab"),
+    "Телевизор": ("UHD", "OLED", "QLED"),
+    "Наушники": ("Buds", "Studio"),
+    "Умные часы": ("Watch", "Band"),
+}
+NAMES = {
+    NetworkNode.FACTORY: "Завод",
+    NetworkNode.RETAIL: "Сеть магазинов",
+    NetworkNode.INDIVIDUAL: "ИП",
+}
+# Типичный долг перед поставщиком по уровням: медиана и разброс логнормального
+# распределения; у части звеньев долга нет совсем
+DEBT_MEDIAN = {1: 200000, 2: 20000}
+DEBT_SIGMA = 1.2
+NO_DEBT_SHARE = 0.2
+FIRST_RELEASE = date(2018, 1, 1)
 
-def fill_db():
+
+class NetworkGenerator:
+    """
+    Детерминированный генератор сети: при одинаковом seed и параметрах
+    выдаёт одни и те же звенья и продукты. Каждый завод получает fanout
+    розничных сетей, каждая сеть — fanout индивидуальных предпринимателей.
+    """
+
+    def __init__(self, seed: int, fanout: int, products_per_node: int, offset: int):
+        self.random = random.Random(seed)
+        self.fanout = fanout
+        self.products_per_node = products_per_node
+        # номера звеньев продолжаются после уже существующих, чтобы телефоны
+        # и email не пересекались с данными в базе
+        self.counter = offset
+        self.countries = list(COUNTRIES)
+        self.country_weights = [weight for weight, _ in COUNTRIES.values()]
+
+    def node(self, node_type: str, supplier: NetworkNode | None) -> NetworkNode:
+        self.counter += 1
+        number = self.counter
+        country = self.random.choices(self.countries, self.country_weights)[0]
+        cities = COUNTRIES[country][1]
+        city = self.random.choices(list(cities), list(cities.values()))[0]
+        node = NetworkNode(
+            name=f"{NAMES[node_type]} №{number}",
+            node_type=node_type,
+            email=f"node{number}@example.com",
+            phone=f"+79{number:09d}",
+            country=country,
+            city=city,
+            street=self.random.choice(STREETS),
+            house_number=str(self.random.randint(1, 200)),
+        )
+        if supplier is None:
+            node.level, node.path = 0, PATH_SEPARATOR
+        else:
+            node.supplier = supplier
+            node.level = supplier.level + 1
+            node.path = f"{supplier.path}{supplier.pk}{PATH_SEPARATOR}"
+            node.debt_to_supplier = self.debt(node.level)
+        return node
+
+    def debt(self, level: int) -> Decimal:
+        if self.random.random() < NO_DEBT_SHARE:
+            return Decimal("0.00")
+        value = self.random.lognormvariate(0, DEBT_SIGMA) * DEBT_MEDIAN[level]
+        return Decimal(f"{value:.2f}")
+
+    def products(self, node: NetworkNode) -> list[Product]:
+        products = {}
+        for _ in range(self.products_per_node):
+            name = self.random.choice(list(PRODUCTS))
+            model = (
+                f"{self.random.choice(PRODUCTS[name])}-{self.random.randint(1, 999)}"
+            )
+            release_date = FIRST_RELEASE + timedelta(days=self.random.randint(0, 2500))
+            products[(name, model)] = Product(
+                name=name, model=model, release_date=release_date, network_node=node
+            )
+        return list(products.values())
+
+    def chunk(self, factories: int) -> tuple[int, int]:
+        """Создаёт factories заводов со всеми потомками и продуктами одной транзакцией"""
+        with transaction.atomic():
+            layer = [self.node(NetworkNode.FACTORY, None) for _ in range(factories)]
+            NetworkNode.objects.bulk_create(layer)
+            nodes = list(layer)
+            for node_type in (NetworkNode.RETAIL, NetworkNode.INDIVIDUAL):
+                layer = [
+                    self.node(node_type, supplier)
+                    for supplier in layer
+                    for _ in range(self.fanout)
+                ]
+                NetworkNode.objects.bulk_create(layer)
+                nodes.extend(layer)
+            products = [product for node in nodes for product in self.products(node)]
+            Product.objects.bulk_create(products, batch_size=5000)
+        return len(nodes), len(products)
+
+
+def fill_db(factories=1, fanout=2, products_per_node=1, seed=42, batch_size=10000):
     logger.info("Заполнение базы тестовыми звеньями сети и продуктами...")
+    offset = NetworkNode.objects.aggregate(last=Max("id"))["last"] or 0
+    generator = NetworkGenerator(seed, fanout, products_per_node, offset)
+    # дерево одного завода целиком попадает в одну пачку
+    tree_size = 1 + fanout + fanout**2
+    factories_per_chunk = max(1, batch_size // tree_size)
 
-    # 1. Создаем заводы (уровень 0)
-    factory = NetworkNode.objects.create(
-        name="Завод Электроника",
-        node_type=NetworkNode.FACTORY,
-        email="factory@electronics.com",
-        phone="+79990001111",
-        country="Россия",
-        city="Москва",
-        street="Электрозаводская",
-        house_number="1",
-    )
-    logger.info(f"Создан завод: {factory}")
-
-    # 2. Розничная сеть (уровень 1, supplier=factory)
-    retail = NetworkNode.objects.create(
-        name="Сеть Магазинов Техно",
-        node_type=NetworkNode.RETAIL,
-        email="retail@techno.com",
-        phone="+79990002222",
-        country="Россия",
-        city="Санкт-Петербург",
-        street="Технологическая",
-        house_number="10",
-        supplier=factory,
-        debt_to_supplier="100000.00",
-    )
-    logger.info(f"Создана розничная сеть: {retail}")
-
-    # 3. Индивидуальный предприниматель (уровень 2, supplier=retail)
-    individual = NetworkNode.objects.create(
-        name="ИП Иванов",
-        node_type=NetworkNode.INDIVIDUAL,
-        email="ivanov@ip.com",
-        phone="+79990003333",
-        country="Россия",
-        city="Казань",
-        street="Предпринимательская",
-        house_number="5",
-        supplier=retail,
-        debt_to_supplier="25000.00",
-    )
-    logger.info(f"Создан индивидуальный предприниматель: {individual}")
-
-    # 4. Еще один магазин (уровень 1, supplier=factory)
-    retail2 = NetworkNode.objects.create(
-        name="ТехноМаркет",
-        node_type=NetworkNode.RETAIL,
-        email="shop@technomarket.com",
-        phone="+79990004444",
-        country="Россия",
-        city="Новосибирск",
-        street="Маркетная",
-        house_number="7",
-        supplier=factory,
-        debt_to_supplier="50000.00",
-    )
-    logger.info(f"Создана розничная сеть: {retail2}")
-
-    # 5. Продукты для каждого звена
-    products = [
-        Product.objects.create(
-            name="Смартфон X1",
-            model="X1-2024",
-            release_date=date(2024, 3, 1),
-            network_node=factory,
-        ),
-        Product.objects.create(
-            name="Ноутбук Pro",
-            model="Pro-15",
-            release_date=date(2023, 12, 15),
-            network_node=retail,
-        ),
-        Product.objects.create(
-            name="Планшет Mini",
-            model="Mini-8",
-            release_date=date(2024, 1, 20),
-            network_node=individual,
-        ),
-        Product.objects.create(
-            name="Телевизор UltraHD",
-            model="UHD-55",
-            release_date=date(2023, 11, 5),
-            network_node=retail2,
-        ),
-    ]
-    for product in products:
-        logger.info(f"Создан продукт: {product}")
+    started = time.monotonic()
+    nodes_total = products_total = 0
+    for start in range(0, factories, factories_per_chunk):
+        nodes, products = generator.chunk(min(factories_per_chunk, factories - start))
+        nodes_total += nodes
+        products_total += products
+        rate = nodes_total / (time.monotonic() - started)
+        logger.info(
+            f"Создано звеньев: {nodes_total}, продуктов: {products_total} "
+            f"({rate:.0f} звеньев/с)"
+        )
+    invalidate_network_cache()
 
     logger.info("База успешно заполнена!")
+    return nodes_total, products_total
 
 
 class Command(BaseCommand):
-    help = "Заполняет базу тестовыми данными для демонстрации"
+    help = "Заполняет базу воспроизводимыми тестовыми данными любого объёма"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--factories", type=int, default=1, help="Количество заводов"
+        )
+        parser.add_argument(
+            "--fanout",
+            type=int,
+            default=2,
+            help="Количество покупателей у каждого завода и каждой розничной сети",
+        )
+        parser.add_argument(
+            "--products-per-node",
+            type=int,
+            default=1,
+            help="Количество продуктов у каждого звена",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=42, help="Зерно генератора случайных чисел"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Примерное количество звеньев, записываемых одной транзакцией",
+        )
 
-    def handle(self, *args, **kwargs):
-        fill_db()
+    def handle(self, *args, **options):
+        for option in ("factories", "batch_size"):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} должен быть больше 0")
+        for option in ("fanout", "products_per_node"):
+            if options[option] < 0:
+                raise CommandError(
+                    f"--{option.replace('_', '-')} не может быть отрицательным"
+                )
+        nodes, products = fill_db(
+            factories=options["factories"],
+            fanout=options["fanout"],
+            products_per_node=options["products_per_node"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Создано звеньев: {nodes}, продуктов: {products}")
+        )
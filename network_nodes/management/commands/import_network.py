@@ -0,0 +1,83 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network_nodes.importers import (
+    ImportCheckpoint,
+    NodeImporter,
+    ProductImporter,
+    read_rows,
+)
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Потоковый импорт звеньев сети и продуктов из CSV или NDJSON файлов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", help="Файл звеньев сети (.csv или .ndjson)")
+        parser.add_argument("--products", help="Файл продуктов (.csv или .ndjson)")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество строк, записываемых одной транзакцией",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default="import_network.checkpoint.json",
+            help="Файл контрольной точки",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить импорт с сохранённой контрольной точки",
+        )
+
+    def handle(self, *args, **options):
+        if not options["nodes"] and not options["products"]:
+            raise CommandError("Укажите --nodes и/или --products")
+
+        checkpoint = ImportCheckpoint(options["checkpoint"])
+        if options["resume"]:
+            checkpoint.load()
+            logger.info(
+                f"Продолжение импорта: звенья со строки "
+                f"{checkpoint.state['nodes_line'] + 1}, продукты со строки "
+                f"{checkpoint.state['products_line'] + 1}"
+            )
+
+        if options["nodes"]:
+            importer = NodeImporter(checkpoint, options["batch_size"])
+            self._run(importer, options["nodes"], checkpoint.state["nodes_line"])
+            importer.finish()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Звеньев создано: {importer.created}, "
+                    f"отклонено: {importer.rejected}"
+                )
+            )
+
+        if options["products"]:
+            importer = ProductImporter(checkpoint, options["batch_size"])
+            self._run(importer, options["products"], checkpoint.state["products_line"])
+            importer.flush()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Продуктов добавлено: {importer.inserted}, "
+                    f"обновлено: {importer.updated}, отклонено: {importer.rejected}"
+                )
+            )
+
+    def _run(self, importer, path, skip):
+        started = time.monotonic()
+        logger.info(f"Импорт {path}...")
+        for line, row in read_rows(path, skip):
+            importer.add(line, row)
+            if line % importer.batch_size == 0:
+                rate = (line - skip) / (time.monotonic() - started)
+                logger.info(f"{path}: обработано строк {line} ({rate:.0f} строк/с)")
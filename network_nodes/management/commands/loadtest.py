@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network_nodes.loadtest import DEFAULT_MIX, LoadTest, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочное тестирование запущенного сервера (runserver, gunicorn, uvicorn): "
+        "параллельные keep-alive соединения с JWT-авторизацией"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--email",
+            default=os.getenv("SUPERUSER_EMAIL"),
+            help="Email сотрудника, по умолчанию SUPERUSER_EMAIL",
+        )
+        parser.add_argument(
+            "--password",
+            default=os.getenv("SUPERUSER_PASSWORD"),
+            help="Пароль сотрудника, по умолчанию SUPERUSER_PASSWORD",
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(
+                f"{name}={weight}" for name, weight in DEFAULT_MIX.items()
+            ),
+            help="Веса типов запросов: list, retrieve, update, login",
+        )
+        parser.add_argument(
+            "--connections", type=int, default=10, help="Количество соединений"
+        )
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Длительность прогона, с"
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            help="Общее количество запросов (вместо длительности)",
+        )
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--output", help="Файл для отчёта в JSON")
+
+    def handle(self, *args, **options):
+        if not options["email"] or not options["password"]:
+            raise CommandError("Укажите --email и --password сотрудника")
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        load_test = LoadTest(
+            url=options["url"],
+            email=options["email"],
+            password=options["password"],
+            mix=mix,
+            connections=options["connections"],
+            duration=options["duration"],
+            requests=options["requests"],
+            seed=options["seed"],
+        )
+        try:
+            report = asyncio.run(load_test.run())
+        except (OSError, RuntimeError) as error:
+            raise CommandError(f"Нагрузочный прогон не выполнен: {error}")
+
+        self.stdout.write(
+            f"Соединений: {report['connections']}, запросов: {report['requests']} "
+            f"за {report['elapsed_s']} с, {report['throughput_rps']} запросов/с, "
+            f"ошибок: {report['error_rate']:.2%}"
+        )
+        for kind, item in report["scenarios"].items():
+            self.stdout.write(
+                f"\n{kind}: {item['requests']} запросов, {item['throughput_rps']} запросов/с, "
+                f"ошибок {item['error_rate']:.2%}, статусы {item['statuses']}\n"
+                f"  p50 {item['p50_ms']} мс, p90 {item['p90_ms']} мс, "
+                f"p99 {item['p99_ms']} мс, max {item['max_ms']} мс"
+            )
+            width = max(item["histogram"].values())
+            for bucket, count in item["histogram"].items():
+                bar = "#" * max(1, round(40 * count / width))
+                self.stdout.write(f"  {bucket:>7} мс {count:>7} {bar}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,30 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from network_nodes.services import repair_hierarchy
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Находит и исправляет устаревшие уровни и пути звеньев сети пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество звеньев, проверяемых одним запросом",
+        )
+
+    def handle(self, *args, **options):
+        logger.info("Проверка уровней иерархии звеньев сети...")
+        passes = repair_hierarchy(batch_size=options["batch_size"])
+        logger.info(f"Корневых звеньев исправлено: {passes[0]}")
+        for number, updated in enumerate(passes[1:], start=1):
+            logger.info(f"Проход {number}: исправлено звеньев {updated}")
+        total = sum(passes)
+        self.stdout.write(self.style.SUCCESS(f"Исправлено звеньев: {total}"))
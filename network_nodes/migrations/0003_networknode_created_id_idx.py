@@ -0,0 +1,19 @@
+# Generated by Django 4.2.2 on 2026-10-17 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network_nodes", "0002_product_product_unique_product_per_node"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="networknode",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="networknode_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.2 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    """Заполняет путь и уровень существующих звеньев по цепочке поставщиков"""
+    NetworkNode = apps.get_model("network_nodes", "NetworkNode")
+    suppliers = dict(NetworkNode.objects.values_list("id", "supplier_id"))
+    paths = {}
+
+    def resolve(node_id):
+        chain = []
+        while node_id is not None and node_id not in paths:
+            if node_id in chain:
+                # цикл в данных: считаем звено корнем
+                node_id = None
+                break
+            chain.append(node_id)
+            node_id = suppliers.get(node_id)
+        prefix = "/" if node_id is None else f"{paths[node_id]}{node_id}/"
+        for current_id in reversed(chain):
+            paths[current_id] = prefix
+            prefix = f"{prefix}{current_id}/"
+
+    for node_id in suppliers:
+        resolve(node_id)
+
+    nodes = list(NetworkNode.objects.only("id", "path", "level"))
+    for node in nodes:
+        node.path = paths[node.id]
+        node.level = node.path.count("/") - 1
+    NetworkNode.objects.bulk_update(nodes, ["path", "level"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network_nodes", "0003_networknode_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="networknode",
+            name="path",
+            field=models.CharField(
+                default="/",
+                editable=False,
+                help_text="Идентификаторы всех поставщиков от корня, например /1/5/",
+                max_length=255,
+                verbose_name="Путь в иерархии",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="networknode",
+            index=models.Index(
+                fields=["path"],
+                name="networknode_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
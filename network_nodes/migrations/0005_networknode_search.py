@@ -0,0 +1,23 @@
+# Generated by Django 4.2.2 on 2026-10-17 09:12
+
+from django.db import migrations
+
+from network_nodes.search import install_search, uninstall_search
+
+
+def create_search_index(apps, schema_editor):
+    install_search(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("network_nodes", "0004_networknode_path"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-17 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network_nodes", "0005_networknode_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="networknode",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="Последнее изменение звена, его поставщика или продуктов",
+                verbose_name="Время изменения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время изменения"),
+        ),
+        migrations.AddIndex(
+            model_name="networknode",
+            index=models.Index(
+                fields=["updated_at"], name="networknode_updated_at_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.2 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+from network_nodes.locations import city_key, country_code
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def backfill_location_keys(apps, schema_editor):
+    """Заполняет нормализованные колонки пачками по возрастанию id"""
+    NetworkNode = apps.get_model("network_nodes", "NetworkNode")
+    manager = NetworkNode.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    while True:
+        batch = list(
+            manager.filter(pk__gt=last_id)
+            .order_by("pk")
+            .only("pk", "country", "city")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for node in batch:
+            node.country_code = country_code(node.country)
+            node.city_key = city_key(node.city)
+        manager.bulk_update(batch, ["country_code", "city_key"])
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network_nodes", "0006_networknode_product_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="networknode",
+            name="city_key",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Название города в нижнем регистре без лишних пробелов",
+                max_length=100,
+                verbose_name="Ключ города",
+            ),
+        ),
+        migrations.AddField(
+            model_name="networknode",
+            name="country_code",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="ISO 3166-1 alpha-2, пусто для неизвестной страны",
+                max_length=2,
+                verbose_name="Код страны",
+            ),
+        ),
+        migrations.RunPython(backfill_location_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="networknode",
+            index=models.Index(
+                fields=["country_code", "city_key"], name="networknode_country_city_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="networknode",
+            index=models.Index(fields=["city_key"], name="networknode_city_key_idx"),
+        ),
+    ]
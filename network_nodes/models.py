@@ -2,11 +2,48 @@ from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from phonenumber_field.modelfields import PhoneNumberField
 
+from network_nodes.locations import city_key, country_code
+
 NULLABLE = {"null": True, "blank": True}
 
+# разделитель идентификаторов в материализованном пути
+PATH_SEPARATOR = "/"
+
+
+class NetworkNodeQuerySet(models.QuerySet):
+    def descendants_of(self, node):
+        """
+        Все потомки звена одним диапазонным запросом по индексу path.
+        """
+        return self.with_path_prefix(node.subtree_prefix)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create не вызывает save(), поэтому адрес нормализуем здесь"""
+        objs = list(objs)
+        for obj in objs:
+            obj.normalize_location()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def with_path_prefix(self, *prefixes: str):
+        """Звенья, путь которых начинается с одного из заданных префиксов"""
+        vendor = connections[self.db].vendor
+        condition = models.Q()
+        for prefix in prefixes:
+            if vendor == "sqlite":
+                # LIKE в SQLite не использует индекс, поэтому берём диапазон
+                # [prefix, prefix с увеличенным последним символом)
+                upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                condition |= models.Q(path__gte=prefix, path__lt=upper)
+            else:
+                # в PostgreSQL префиксный LIKE опирается на индекс varchar_pattern_ops
+                condition |= models.Q(path__startswith=prefix)
+        return self.filter(condition)
+
 
 class NetworkNode(models.Model):
     """
@@ -54,6 +91,22 @@ class NetworkNode(models.Model):
         max_length=100, verbose_name="Город", help_text="Укажите город"
     )
 
+    country_code = models.CharField(
+        max_length=2,
+        blank=True,
+        editable=False,
+        verbose_name="Код страны",
+        help_text="ISO 3166-1 alpha-2, пусто для неизвестной страны",
+    )
+
+    city_key = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name="Ключ города",
+        help_text="Название города в нижнем регистре без лишних пробелов",
+    )
+
     street = models.CharField(
         max_length=100, verbose_name="Улица", help_text="Укажите улицу", blank=True
     )
@@ -82,20 +135,110 @@ class NetworkNode(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Время создания")
 
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Время изменения",
+        help_text="Последнее изменение звена, его поставщика или продуктов",
+    )
+
     level = models.PositiveSmallIntegerField(
         default=0, editable=False, verbose_name="Уровень в иерархии"
     )
 
+    path = models.CharField(
+        max_length=255,
+        default=PATH_SEPARATOR,
+        editable=False,
+        verbose_name="Путь в иерархии",
+        help_text="Идентификаторы всех поставщиков от корня, например /1/5/",
+    )
+
+    objects = NetworkNodeQuerySet.as_manager()
+
+    # поля, изменения которых отслеживаются относительно загруженных из БД значений
+    TRACKED_FIELDS = ("supplier_id", "debt_to_supplier", "node_type", "name")
+    # нормализованный адрес: по нему обновляются агрегаты по странам и городам
+    LOCATION_FIELDS = ("country_code", "city_key")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def _remember_loaded_values(self) -> None:
+        self._loaded_values = {
+            field: self.__dict__[field]
+            for field in self.TRACKED_FIELDS + self.LOCATION_FIELDS
+            if field in self.__dict__
+        }
+
+    def has_changed(self, field: str) -> bool:
+        """Изменилось ли отслеживаемое поле с момента загрузки или сохранения"""
+        loaded_values = getattr(self, "_loaded_values", {})
+        if field not in loaded_values:
+            return True
+        return loaded_values[field] != getattr(self, field)
+
+    def loaded_location(self) -> tuple[str, str] | None:
+        """Код страны и ключ города на момент загрузки, None — если не загружались"""
+        loaded_values = getattr(self, "_loaded_values", {})
+        if not all(field in loaded_values for field in self.LOCATION_FIELDS):
+            return None
+        return tuple(loaded_values[field] for field in self.LOCATION_FIELDS)
+
+    @property
+    def subtree_prefix(self) -> str:
+        """Префикс пути, с которого начинаются пути всех потомков звена"""
+        return f"{self.path}{self.pk}{PATH_SEPARATOR}"
+
+    def normalize_location(self) -> None:
+        """Заполняет код страны и ключ города по стране и городу"""
+        self.country_code = country_code(self.country)
+        self.city_key = city_key(self.city)
+
     def save(self, *args, **kwargs):
-        """Автоматический расчет уровня иерархии при сохранении"""
-        # только при создании нового объекта
-        if not self.pk:
+        """Автоматический расчет уровня иерархии и пути при сохранении"""
+        is_new = not self.pk
+        self.normalize_location()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"country", "city"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "country_code", "city_key"}
+        # при создании объекта или при смене поставщика
+        if is_new or self.has_changed("supplier_id"):
+            old_prefix = None if is_new else self.subtree_prefix
+            old_level = self.level
             if self.supplier is None:
                 # завод
                 self.level = 0
+                self.path = PATH_SEPARATOR
             else:
                 self.level = self.supplier.level + 1
-        super().save(*args, **kwargs)
+                self.path = self.supplier.subtree_prefix
+            super().save(*args, **kwargs)
+            if old_prefix and old_prefix != self.subtree_prefix:
+                self._move_descendants(old_prefix, self.level - old_level)
+        else:
+            super().save(*args, **kwargs)
+        if not is_new and self.has_changed("name"):
+            # название поставщика входит в представление покупателей
+            NetworkNode.objects.filter(supplier_id=self.pk).update(
+                updated_at=self.updated_at
+            )
+        self._remember_loaded_values()
+
+    def _move_descendants(self, old_prefix: str, level_shift: int) -> None:
+        """Переносит поддерево под новый путь одним UPDATE"""
+        new_prefix = self.subtree_prefix
+        NetworkNode.objects.with_path_prefix(old_prefix).update(
+            path=Concat(
+                Value(new_prefix),
+                Substr("path", len(old_prefix) + 1),
+                output_field=models.CharField(),
+            ),
+            level=F("level") + level_shift,
+            updated_at=self.updated_at,
+        )
 
     def clean(self):
         """
@@ -110,6 +253,8 @@ class NetworkNode(models.Model):
         # Проверка циклических зависимостей
         if self.supplier and self.supplier.id == self.id:
             errors.setdefault('__all__', []).append('Объект не может быть своим собственным поставщиком')
+        elif self.supplier and self.pk and self.supplier.path.startswith(self.subtree_prefix):
+            errors.setdefault('__all__', []).append('Поставщик не может быть потомком звена')
 
         # Проверка максимального уровня иерархии
         if self.supplier:
@@ -144,6 +289,26 @@ level={self.level})"""
         verbose_name = "Звено сети"
         verbose_name_plural = "Звенья сети"
         ordering = ["-created_at"]
+        indexes = [
+            # опора для курсорной пагинации списка звеньев
+            models.Index(
+                fields=["-created_at", "-id"], name="networknode_created_id_idx"
+            ),
+            # выборка поддерева по префиксу пути
+            models.Index(
+                fields=["path"],
+                name="networknode_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # последнее изменение для ETag и Last-Modified
+            models.Index(fields=["updated_at"], name="networknode_updated_at_idx"),
+            # точные фильтры по коду страны (и городу в ней) и по городу
+            models.Index(
+                fields=["country_code", "city_key"],
+                name="networknode_country_city_idx",
+            ),
+            models.Index(fields=["city_key"], name="networknode_city_key_idx"),
+        ]
 
 
 class Product(models.Model):
@@ -170,6 +335,14 @@ class Product(models.Model):
         related_name="products",
         verbose_name="Звено сети",
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время изменения")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # продукты входят в представление звена
+        NetworkNode.objects.filter(pk=self.network_node_id).update(
+            updated_at=self.updated_at
+        )
 
     def __repr__(self):
         return (
@@ -1,7 +1,22 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class NetworkNodePaginator(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class NetworkNodeCursorPaginator(CursorPagination):
+    """
+    Курсорная (keyset) пагинация звеньев сети.
+
+    Не выполняет COUNT(*) и OFFSET: следующая страница выбирается условием
+    по (-created_at, -id) с опорой на составной индекс, поэтому глубокие
+    страницы стоят столько же, сколько первая.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,33 @@
+import json
+
+from django.conf import settings
+from djangorestframework_camel_case.settings import api_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from config.camel_case import underscoreize
+
+
+class CamelCaseNDJSONParser(BaseParser):
+    """
+    Парсер NDJSON (по одному JSON-объекту в строке) с переводом ключей
+    из camelCase в snake_case, как у CamelCaseJSONParser.
+    """
+
+    media_type = "application/x-ndjson"
+    json_underscoreize = api_settings.JSON_UNDERSCOREIZE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        items = []
+        for line_number, line in enumerate(stream, start=1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error in line {line_number} - {exc}")
+        return underscoreize(items, **self.json_underscoreize)
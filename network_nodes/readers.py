@@ -0,0 +1,320 @@
+"""
+Быстрое чтение звеньев сети для ответов API.
+
+Сериализатор DRF обходит поля каждого объекта модели: разбирает телефон,
+квантует Decimal, вызывает get_node_type_display и сериализует вложенные
+продукты. Для страниц по 100 звеньев это основная часть времени ответа.
+NetworkNodeReader выбирает строки через values() и строит словари заранее
+подготовленными преобразователями, повторяя формат полей сериализатора.
+"""
+
+import decimal
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import CharField, ExpressionWrapper, F, QuerySet
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from phonenumber_field.serializerfields import PhoneNumberField
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from config.camel_case import underscore_key
+from network_nodes.models import Product
+
+# связи, включаемые параметром ?expand=, и соответствующие им поля ответа
+EXPANDABLE = {"products": ("products",), "supplier": ("supplier_name",)}
+
+
+def _identity(value):
+    return value
+
+
+def _string(value):
+    return None if value is None else str(value)
+
+
+def _date(value):
+    return None if value is None else value.isoformat()
+
+
+def _datetime_converter():
+    zone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def convert(value):
+        if value is None:
+            return None
+        if zone is not None and timezone.is_aware(value):
+            value = value.astimezone(zone)
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+def _decimal_converter(field: serializers.DecimalField):
+    if field.localize or field.normalize_output or field.decimal_places is None:
+        return _field_converter(field)
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    exponent = Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+
+    def convert(value):
+        if value is None:
+            return None
+        value = value.quantize(exponent, rounding=field.rounding, context=context)
+        return f"{value:f}" if coerce_to_string else value
+
+    return convert
+
+
+def _phone_is_stored_formatted() -> bool:
+    # в БД номер хранится в формате PHONENUMBER_DB_FORMAT, а str(PhoneNumber)
+    # отдаёт PHONENUMBER_DEFAULT_FORMAT: при совпадении строку из БД не разбираем
+    db_format = getattr(settings, "PHONENUMBER_DB_FORMAT", "E164")
+    default_format = getattr(settings, "PHONENUMBER_DEFAULT_FORMAT", "E164")
+    return db_format == default_format
+
+
+def _column(field: serializers.Field, model) -> tuple[str, object, object]:
+    """
+    Колонка values(), выражение для неё (или None, если это поле модели)
+    и преобразователь значения для поля сериализатора
+    """
+    source = field.source
+    if source.startswith("get_") and source.endswith("_display"):
+        name = source.removeprefix("get_").removesuffix("_display")
+        choices = dict(model._meta.get_field(name).flatchoices)
+        return name, None, lambda value: choices.get(value, value)
+
+    column = source.replace(".", "__")
+    if isinstance(field, PhoneNumberField):
+        if _phone_is_stored_formatted():
+            # строка без from_db_value поля модели, которое разбирает номер
+            raw = ExpressionWrapper(F(column), output_field=CharField())
+            return f"{column}_raw", raw, _identity
+        return column, None, _string
+    if isinstance(field, serializers.DecimalField):
+        return column, None, _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return column, None, _datetime_converter()
+    if isinstance(field, serializers.DateField):
+        return column, None, _date
+    if isinstance(
+        field,
+        (
+            serializers.CharField,
+            serializers.ChoiceField,
+            serializers.IntegerField,
+            serializers.PrimaryKeyRelatedField,
+        ),
+    ):
+        # строки, целые числа и id связанных объектов приходят из БД готовыми
+        return column, None, _identity
+    return column, None, _field_converter(field)
+
+
+def _field_converter(field: serializers.Field):
+    """Остальные поля преобразуются самим полем сериализатора"""
+
+    def convert(value):
+        return None if value is None else field.to_representation(value)
+
+    return convert
+
+
+class RowSerializer:
+    """
+    Преобразователь строк values() в словари полей сериализатора. Поля
+    через связь (supplier.name) без связанного объекта пропускаются,
+    как это делает DRF для необязательных полей.
+    """
+
+    def __init__(self, serializer: serializers.Serializer, model, fields=None):
+        self.columns = []
+        self.expressions = {}
+        self.plan = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                continue
+            if fields is not None and name not in fields:
+                continue
+            column, expression, convert = _column(field, model)
+            skip_missing = "." in field.source and not field.allow_null
+            if expression is not None:
+                self.expressions[column] = expression
+            elif column not in self.columns:
+                self.columns.append(column)
+            self.plan.append((name, column, convert, skip_missing))
+
+    def __call__(self, row: dict) -> dict:
+        data = {}
+        for name, column, convert, skip_missing in self.plan:
+            value = row[column]
+            if value is None and skip_missing:
+                continue
+            data[name] = convert(value)
+        return data
+
+
+class NetworkNodeReader:
+    """
+    Чтение звеньев в формате NetworkNodeSerializer (или его наследника)
+    без создания объектов модели. Продукты выбираются одним запросом
+    на всю страницу и упорядочены по id.
+
+    fields ограничивает набор полей ответа (см. requested_fields): из БД
+    выбираются только их колонки, JOIN поставщика и запрос продуктов
+    выполняются, только если нужны supplier_name и products.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.fields = [
+            name for name in serializer.fields if fields is None or name in fields
+        ]
+        self.node = RowSerializer(serializer, self.model, fields)
+        products = serializer.fields.get("products")
+        self.product = (
+            RowSerializer(products.child, Product)
+            if products is not None and "products" in self.fields
+            else None
+        )
+
+    def project(self, queryset: QuerySet, extra_columns=()) -> QuerySet:
+        """
+        Выборка только нужных колонок; связи берутся через JOIN в values().
+        id нужен для продуктов, extra_columns — например, для курсора пагинации
+        """
+        columns = list(self.node.columns)
+        for column in ("id", *extra_columns):
+            if column not in columns:
+                columns.append(column)
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .values(*columns, **self.node.expressions)
+        )
+
+    def to_representation(self, rows) -> list[dict]:
+        rows = list(rows)
+        products = self._products([row["id"] for row in rows]) if self.product else {}
+        result = []
+        for row in rows:
+            data = self.node(row)
+            if self.product:
+                data["products"] = products.get(row["id"], [])
+            # порядок ключей как у сериализатора
+            result.append({name: data[name] for name in self.fields if name in data})
+        return result
+
+    def _products(self, node_ids: list[int]) -> dict:
+        if not node_ids:
+            return {}
+        columns = list(self.product.columns)
+        if "network_node" not in columns:
+            columns.append("network_node")
+        grouped = defaultdict(list)
+        rows = (
+            Product.objects.filter(network_node_id__in=node_ids)
+            .order_by("id")
+            .values(*columns, **self.product.expressions)
+        )
+        for row in rows:
+            grouped[row["network_node"]].append(self.product(row))
+        return grouped
+
+
+def requested_fields(query_params, serializer_class) -> list | None:
+    """
+    Поля ответа по параметрам ?fields= и ?expand= (через запятую, в camelCase
+    или snake_case). Без параметров — все поля сериализатора. Если задан
+    хотя бы один из них, связи (продукты, название поставщика) включаются
+    только через expand или явно в fields.
+    """
+    fields_param = query_params.get("fields")
+    expand_param = query_params.get("expand")
+    if fields_param is None and expand_param is None:
+        return None
+
+    available = list(serializer_class().fields)
+    expand = _split(expand_param)
+    unknown = expand - EXPANDABLE.keys()
+    if unknown:
+        raise ValidationError(
+            {"expand": [f"Неизвестные связи: {', '.join(sorted(unknown))}."]}
+        )
+    if fields_param:
+        fields = _split(fields_param)
+        unknown = fields - set(available)
+        if unknown:
+            raise ValidationError(
+                {"fields": [f"Неизвестные поля: {', '.join(sorted(unknown))}."]}
+            )
+    else:
+        related = {name for names in EXPANDABLE.values() for name in names}
+        fields = set(available) - related
+    for relation in expand:
+        fields.update(EXPANDABLE[relation])
+    return [name for name in available if name in fields]
+
+
+def _split(value) -> set[str]:
+    if not value:
+        return set()
+    return {underscore_key(name.strip()) for name in value.split(",") if name.strip()}
+
+
+class FastReadMixin:
+    """
+    Списки и отдельные звенья отдаются через NetworkNodeReader вместо
+    сериализатора; сериализатор остаётся описанием формата (и схемы API)
+    и используется при записи. Поддерживаются ?fields= и ?expand=.
+    """
+
+    def get_reader(self) -> NetworkNodeReader:
+        serializer_class = self.get_serializer_class()
+        return NetworkNodeReader(
+            serializer_class,
+            requested_fields(self.request.query_params, serializer_class),
+        )
+
+    def get_extra_columns(self) -> list[str]:
+        """Колонки строк сверх полей ответа"""
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        # курсорная пагинация берёт позицию из первого поля сортировки строки
+        return [field.lstrip("-") for field in ordering]
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        queryset = reader.project(
+            self.filter_queryset(self.get_queryset()),
+            extra_columns=self.get_extra_columns(),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        return Response(reader.to_representation(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            reader.project(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        # разрешения представлений звеньев не проверяют объект, поэтому
+        # check_object_permissions с объектом модели не нужен
+        return Response(reader.to_representation([row])[0])
@@ -0,0 +1,131 @@
+"""
+Индексированный поиск звеньев сети по названию, городу и стране.
+
+PostgreSQL: поиск подстроки через ILIKE по GIN-индексам pg_trgm,
+ранжирование по TrigramWordSimilarity. SQLite: виртуальная таблица FTS5
+с токенизатором trigram, синхронизируемая триггерами, ранжирование по bm25.
+"""
+
+from django.db import connection
+from django.db.models import FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+from network_nodes.models import NetworkNode
+
+SEARCH_FIELDS = ("name", "city", "country")
+# вес совпадений в названии относительно города и страны (bm25 в SQLite)
+NAME_WEIGHT = 10.0
+# trigram-индексы не помогают для запросов короче трёх символов
+MIN_INDEXED_LENGTH = 3
+
+TABLE = NetworkNode._meta.db_table
+FTS_TABLE = f"{TABLE}_search"
+TRIGRAM_INDEXES = {field: f"networknode_{field}_trgm_idx" for field in SEARCH_FIELDS}
+# триггеры синхронизации FTS5: после вставки, удаления и изменения
+TRIGGER_SUFFIXES = ("ai", "ad", "au")
+
+
+def search_nodes(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Фильтрует звенья по подстроке query в названии, городе или стране
+    и сортирует по релевантности (аннотация search_rank)
+    """
+    query = query.strip()
+    if len(query) >= MIN_INDEXED_LENGTH and connection.vendor == "sqlite":
+        match = '"{}"'.format(query.replace('"', '""'))
+        queryset = queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, %s, 1.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id",
+                [NAME_WEIGHT, match],
+                output_field=FloatField(),
+            )
+        )
+    else:
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f"{field}__icontains": query})
+        queryset = queryset.filter(condition)
+        if connection.vendor == "postgresql":
+            from django.contrib.postgres.search import TrigramWordSimilarity
+
+            rank = Greatest(
+                *(TrigramWordSimilarity(query, field) for field in SEARCH_FIELDS)
+            )
+        else:
+            rank = Value(0.0, output_field=FloatField())
+        queryset = queryset.annotate(search_rank=rank)
+    return queryset.order_by("-search_rank", "-id")
+
+
+def install_search(schema_editor) -> None:
+    """
+    Создаёт поисковые индексы для текущей СУБД. Операции идемпотентны:
+    в SQLite пересоздание таблицы при изменении схемы удаляет триггеры,
+    поэтому функция вызывается и после каждой миграции.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # icontains в PostgreSQL сравнивает UPPER(поле), индекс строится по тому же выражению
+        for field, index in TRIGRAM_INDEXES.items():
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {index} ON {TABLE} "
+                f"USING gin (upper({field}) gin_trgm_ops)"
+            )
+    elif vendor == "sqlite":
+        # без таблицы или триггеров индекс мог устареть: перестраиваем его
+        triggers = [f"{FTS_TABLE}_{suffix}" for suffix in TRIGGER_SUFFIXES]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                "AND name IN (%s, %s, %s)",
+                triggers,
+            )
+            stale = cursor.fetchone()[0] < len(triggers)
+        columns = ", ".join(SEARCH_FIELDS)
+        new_values = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+        old_values = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+        delete_old = (
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert_new = (
+            f"INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (new.id, {new_values});"
+        )
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{columns}, content='{TABLE}', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} "
+            f"BEGIN {insert_new} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} "
+            f"BEGIN {delete_old} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+            f"AFTER UPDATE OF {columns} ON {TABLE} BEGIN {delete_old} {insert_new} END"
+        )
+        if stale:
+            schema_editor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+
+def uninstall_search(schema_editor) -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for index in TRIGRAM_INDEXES.values():
+            schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+    elif vendor == "sqlite":
+        for suffix in TRIGGER_SUFFIXES:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
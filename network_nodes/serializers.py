@@ -65,6 +65,7 @@ class NetworkNodeSerializer(serializers.ModelSerializer):
         help_text="Задолженность в денежном выражении",
     )
     created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
     level = serializers.IntegerField(read_only=True)
 
     node_type_display = serializers.CharField(
@@ -88,6 +89,7 @@ class NetworkNodeSerializer(serializers.ModelSerializer):
             "supplier_name",  # только для чтения
             "debt_to_supplier",  # не обязателен для заполнения, по умолчанию 0
             "created_at",  # только для чтения
+            "updated_at",  # только для чтения
             "level",  # только для чтения
             "products",  # только для чтения
         ]
@@ -104,3 +106,117 @@ class NetworkNodeSerializer(serializers.ModelSerializer):
         # Удаляем debt_to_supplier, если он пришёл в запросе
         validated_data.pop("debt_to_supplier", None)
         return super().update(instance, validated_data)
+
+
+class SubtreeRollupSerializer(serializers.Serializer):
+    """
+    Агрегаты по поддереву завода или розничной сети (только для чтения).
+    """
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    node_type = serializers.ChoiceField(choices=NetworkNode.NODE_TYPE_CHOICES)
+    level = serializers.IntegerField()
+    subtree_debt = serializers.DecimalField(
+        max_digits=17,
+        decimal_places=2,
+        help_text="Суммарная задолженность потомков звена",
+    )
+    subtree_size = serializers.IntegerField(help_text="Количество потомков звена")
+    nodes_per_level = serializers.DictField(
+        child=serializers.IntegerField(),
+        help_text="Количество потомков на каждом уровне иерархии",
+    )
+
+
+class FacetCountSerializer(serializers.Serializer):
+    nodes = serializers.IntegerField(help_text="Количество звеньев")
+    debt = serializers.DecimalField(
+        max_digits=17, decimal_places=2, help_text="Суммарная задолженность звеньев"
+    )
+
+
+class FacetSerializer(FacetCountSerializer):
+    by_node_type = serializers.DictField(
+        child=FacetCountSerializer(), help_text="Разбивка по типам звеньев"
+    )
+    by_level = serializers.DictField(
+        child=FacetCountSerializer(), help_text="Разбивка по уровням иерархии"
+    )
+
+
+class CityFacetSerializer(FacetSerializer):
+    city_key = serializers.CharField(help_text="Ключ города для фильтра city_key")
+    city = serializers.CharField()
+
+
+class CountryFacetSerializer(FacetSerializer):
+    """
+    Агрегаты звеньев страны и её городов (только для чтения).
+    """
+
+    country_code = serializers.CharField(
+        help_text="Код ISO 3166-1 alpha-2, пусто для неизвестных стран"
+    )
+    country = serializers.CharField()
+    cities = CityFacetSerializer(many=True)
+
+
+class NetworkNodeBatchItemSerializer(NetworkNodeSerializer):
+    """
+    Элемент пакетного создания звеньев сети.
+
+    Поставщик задаётся id существующего звена (supplier) или временным id
+    звена из того же пакета (supplier_temp_id). Существование поставщиков
+    проверяется одним запросом на весь пакет, поэтому здесь supplier —
+    просто целое число.
+    """
+
+    temp_id = serializers.CharField(
+        required=False, max_length=64, help_text="Временный id звена внутри пакета"
+    )
+    supplier = serializers.IntegerField(
+        allow_null=True, required=False, help_text="ID существующего поставщика"
+    )
+    supplier_temp_id = serializers.CharField(
+        allow_null=True,
+        required=False,
+        max_length=64,
+        help_text="Временный id поставщика из того же пакета",
+    )
+
+    class Meta(NetworkNodeSerializer.Meta):
+        fields = NetworkNodeSerializer.Meta.fields + ["temp_id", "supplier_temp_id"]
+
+    def validate(self, data):
+        data = super().validate(data)
+        if data.get("supplier") is not None and data.get("supplier_temp_id"):
+            raise serializers.ValidationError(
+                "Укажите либо supplier, либо supplier_temp_id."
+            )
+        return data
+
+
+class ProductUpsertSerializer(serializers.Serializer):
+    """
+    Строка пакетной загрузки продуктов. Ключ строки — (network_node, name, model);
+    существование звеньев проверяется одним запросом на весь пакет, а
+    уникальность обеспечивает ON CONFLICT, поэтому построчных запросов нет.
+    """
+
+    name = serializers.CharField(max_length=255)
+    model = serializers.CharField(max_length=255)
+    release_date = serializers.DateField()
+    network_node = serializers.IntegerField(min_value=1)
+
+
+class NetworkNodeExportSerializer(NetworkNodeSerializer):
+    """
+    Сериализатор выгрузки звеньев без вложенных продуктов, чтобы не обращаться
+    к продуктам, когда они не запрошены.
+    """
+
+    class Meta(NetworkNodeSerializer.Meta):
+        fields = [
+            field for field in NetworkNodeSerializer.Meta.fields if field != "products"
+        ]
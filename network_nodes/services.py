@@ -0,0 +1,531 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    CharField,
+    Count,
+    F,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Concat, Length, Replace, StrIndex, Substr
+from django.utils import timezone
+
+from network_nodes.cache import (
+    bump_generation,
+    get_cached_facets,
+    get_cached_rollup,
+    invalidate_network_cache,
+    set_cached_facets,
+    set_cached_rollup,
+)
+from network_nodes.models import PATH_SEPARATOR, NetworkNode, Product
+from network_nodes.serializers import (
+    NetworkNodeBatchItemSerializer,
+    ProductUpsertSerializer,
+)
+
+# максимальный уровень иерархии сети (завод - 0, розничная сеть - 1, ИП - 2)
+MAX_LEVEL = 2
+
+
+def _depth(path_expression):
+    """Уровень звена по его пути: количество разделителей минус один"""
+    return (
+        Length(path_expression)
+        - Length(Replace(path_expression, Value(PATH_SEPARATOR), Value("")))
+        - 1
+    )
+
+
+def detach_subtree(node: NetworkNode) -> int:
+    """
+    Перестраивает путь и уровень потомков удалённого звена одним UPDATE.
+
+    Дети удалённого звена (supplier уже обнулён через SET_NULL) становятся
+    корнями, а уровни всего поддерева пересчитываются из пути.
+    Если в той же операции удалены и предки звена, пути потомков уже
+    укорочены, поэтому ищем их по всем хвостам префикса, оканчивающимся
+    идентификатором звена.
+    """
+    marker = f"{PATH_SEPARATOR}{node.pk}{PATH_SEPARATOR}"
+    prefix = node.subtree_prefix
+    candidates = [
+        prefix[position:]
+        for position in range(len(prefix) - len(marker) + 1)
+        if prefix[position] == PATH_SEPARATOR
+    ]
+    new_path = Substr("path", StrIndex("path", Value(marker)) + len(marker) - 1)
+    return NetworkNode.objects.with_path_prefix(*candidates).update(
+        path=new_path, level=_depth(new_path), updated_at=timezone.now()
+    )
+
+
+def repair_hierarchy(batch_size: int = 1000, max_passes: int = 16) -> list[int]:
+    """
+    Находит и исправляет устаревшие путь и уровень во всей таблице.
+
+    Ожидаемые значения берутся из поставщика: корни получают путь "/" и
+    уровень 0, остальные — путь поставщика с его идентификатором.
+    Таблица обходится пачками по диапазонам id; проходы повторяются, пока
+    есть изменения (исправленный предок может потребовать исправления
+    потомков). Возвращает количество исправленных звеньев за каждый проход.
+    """
+    updated_per_pass = [
+        NetworkNode.objects.filter(supplier__isnull=True)
+        .exclude(path=PATH_SEPARATOR, level=0)
+        .update(path=PATH_SEPARATOR, level=0, updated_at=timezone.now())
+    ]
+
+    supplier = NetworkNode.objects.filter(pk=OuterRef("supplier_id"))
+    expected_path = Concat(
+        F("supplier__path"),
+        Cast("supplier_id", output_field=CharField()),
+        Value(PATH_SEPARATOR),
+        output_field=CharField(),
+    )
+    new_path = Concat(
+        Subquery(supplier.values("path")[:1]),
+        Cast("supplier_id", output_field=CharField()),
+        Value(PATH_SEPARATOR),
+        output_field=CharField(),
+    )
+    new_level = Subquery(supplier.values("level")[:1]) + 1
+
+    bounds = NetworkNode.objects.order_by("pk").values_list("pk", flat=True)
+    first_id, last_id = bounds.first(), bounds.last()
+    if first_id is None:
+        return updated_per_pass
+
+    for _ in range(max_passes):
+        updated = 0
+        for start in range(first_id, last_id + 1, batch_size):
+            stale = (
+                NetworkNode.objects.filter(
+                    pk__gte=start, pk__lt=start + batch_size, supplier__isnull=False
+                )
+                .annotate(
+                    expected_path=expected_path,
+                    expected_level=F("supplier__level") + 1,
+                )
+                .exclude(path=F("expected_path"), level=F("expected_level"))
+            )
+            stale_ids = list(stale.values_list("pk", flat=True))
+            if stale_ids:
+                updated += NetworkNode.objects.filter(pk__in=stale_ids).update(
+                    path=new_path, level=new_level, updated_at=timezone.now()
+                )
+        updated_per_pass.append(updated)
+        if not updated:
+            break
+    if any(updated_per_pass):
+        invalidate_network_cache()
+    return updated_per_pass
+
+
+def compute_subtree_rollup() -> list[dict]:
+    """
+    Задолженность и количество звеньев по уровням в поддереве каждого
+    завода и розничной сети.
+
+    Один агрегирующий запрос группирует всех потомков по (path, level):
+    групп столько, сколько звеньев-поставщиков, а не строк в таблице.
+    Каждая группа затем прибавляется ко всем предкам из своего пути.
+    В агрегаты входят только потомки, само звено не учитывается.
+    """
+    groups = (
+        NetworkNode.objects.exclude(path=PATH_SEPARATOR)
+        .values("path", "level")
+        .annotate(nodes=Count("id"), debt=Sum("debt_to_supplier"))
+        .order_by()
+    )
+    debts = defaultdict(Decimal)
+    levels = defaultdict(lambda: defaultdict(int))
+    for group in groups:
+        for ancestor_id in group["path"].strip(PATH_SEPARATOR).split(PATH_SEPARATOR):
+            ancestor_id = int(ancestor_id)
+            debts[ancestor_id] += group["debt"] or Decimal("0")
+            levels[ancestor_id][group["level"]] += group["nodes"]
+
+    roots = NetworkNode.objects.filter(
+        node_type__in=(NetworkNode.FACTORY, NetworkNode.RETAIL)
+    ).order_by("level", "id")
+    return [
+        {
+            "id": node["id"],
+            "name": node["name"],
+            "node_type": node["node_type"],
+            "level": node["level"],
+            "subtree_debt": debts[node["id"]],
+            "subtree_size": sum(levels[node["id"]].values()),
+            "nodes_per_level": dict(sorted(levels[node["id"]].items())),
+        }
+        for node in roots.values("id", "name", "node_type", "level")
+    ]
+
+
+def get_subtree_rollup() -> list[dict]:
+    """Агрегаты по поддеревьям из кеша; пересчитываются после инвалидации"""
+    rollup = get_cached_rollup()
+    if rollup is None:
+        rollup = compute_subtree_rollup()
+        set_cached_rollup(rollup)
+    return rollup
+
+
+def compute_location_facets(condition: Q = Q()) -> list[dict]:
+    """
+    Количество звеньев и задолженность в группах (код страны, ключ города,
+    тип звена, уровень) одним GROUP BY в БД. Названия страны и города —
+    любые из встречающихся в группе написаний.
+    """
+    return list(
+        NetworkNode.objects.filter(condition)
+        .values("country_code", "city_key", "node_type", "level")
+        .annotate(
+            nodes=Count("id"),
+            debt=Sum("debt_to_supplier"),
+            country=Min("country"),
+            city=Min("city"),
+        )
+        .order_by()
+    )
+
+
+def get_location_facets() -> list[dict]:
+    """Группы compute_location_facets из кеша; пересчитываются после инвалидации"""
+    facets = get_cached_facets()
+    if facets is None:
+        facets = compute_location_facets()
+        set_cached_facets(facets)
+    return facets
+
+
+def refresh_location_facets(locations) -> None:
+    """
+    Пересчитывает в закешированных агрегатах только группы указанных пар
+    (код страны, ключ города) — выборка по индексу, а не по всей таблице.
+    Если агрегатов в кеше нет, они будут посчитаны целиком при чтении.
+    """
+    facets = get_cached_facets()
+    if facets is None:
+        return
+    locations = set(locations)
+    condition = Q()
+    for code, key in locations:
+        condition |= Q(country_code=code, city_key=key)
+    facets = [
+        row for row in facets if (row["country_code"], row["city_key"]) not in locations
+    ]
+    set_cached_facets(facets + compute_location_facets(condition))
+
+
+def _add_to_facet(target: dict, row: dict) -> None:
+    debt = row["debt"] or Decimal("0")
+    target["nodes"] += row["nodes"]
+    target["debt"] += debt
+    for breakdown, key in (
+        ("by_node_type", row["node_type"]),
+        ("by_level", str(row["level"])),
+    ):
+        bucket = target[breakdown].setdefault(key, {"nodes": 0, "debt": Decimal("0")})
+        bucket["nodes"] += row["nodes"]
+        bucket["debt"] += debt
+
+
+def _empty_facet(**fields) -> dict:
+    return {
+        **fields,
+        "nodes": 0,
+        "debt": Decimal("0"),
+        "by_node_type": {},
+        "by_level": {},
+    }
+
+
+def build_location_facets(rows: list[dict]) -> list[dict]:
+    """
+    Страны с разбивкой по типам звеньев и уровням и вложенными городами,
+    по убыванию количества звеньев
+    """
+    countries = {}
+    for row in rows:
+        country = countries.setdefault(
+            row["country_code"],
+            _empty_facet(
+                country_code=row["country_code"], country=row["country"], cities={}
+            ),
+        )
+        country["country"] = min(country["country"], row["country"])
+        city = country["cities"].setdefault(
+            row["city_key"], _empty_facet(city_key=row["city_key"], city=row["city"])
+        )
+        city["city"] = min(city["city"], row["city"])
+        _add_to_facet(country, row)
+        _add_to_facet(city, row)
+
+    def by_size(facet):
+        return -facet["nodes"], facet.get("country_code", facet.get("city_key"))
+
+    result = sorted(countries.values(), key=by_size)
+    for country in result:
+        country["cities"] = sorted(country["cities"].values(), key=by_size)
+    return result
+
+
+def _resolve_batch_levels(valid, suppliers, temp_index, errors) -> dict[int, int]:
+    """
+    Уровни элементов пакета в памяти: от существующего поставщика или от
+    поставщика из того же пакета по временному id. Элементы с неизвестным,
+    ошибочным или циклическим поставщиком получают ошибку.
+    """
+    levels = {}
+
+    def fail(index, message):
+        errors.setdefault(index, {}).setdefault("non_field_errors", []).append(message)
+
+    def resolve(index, visiting):
+        if index in levels:
+            return levels[index]
+        if index in errors:
+            return None
+        data = valid[index]
+        if data.get("supplier") is not None:
+            supplier = suppliers.get(data["supplier"])
+            if supplier is None:
+                fail(index, "Поставщик не найден.")
+                return None
+            level = supplier.level + 1
+        elif data.get("supplier_temp_id"):
+            parent = temp_index.get(data["supplier_temp_id"])
+            if parent is None:
+                fail(index, "Поставщик с таким временным id не найден в пакете.")
+                return None
+            if parent in visiting:
+                fail(index, "Циклическая зависимость поставщиков в пакете.")
+                return None
+            parent_level = resolve(parent, visiting | {index})
+            if parent_level is None:
+                if index not in errors:
+                    fail(index, "Поставщик из пакета содержит ошибки.")
+                return None
+            level = parent_level + 1
+        else:
+            level = 0
+
+        if level and data["node_type"] == NetworkNode.FACTORY:
+            fail(index, "Завод не может иметь поставщика")
+            return None
+        if level > MAX_LEVEL:
+            fail(index, "Максимальный уровень иерархии - 2")
+            return None
+        levels[index] = level
+        return level
+
+    for index in valid:
+        resolve(index, frozenset())
+    return levels
+
+
+def batch_create_nodes(items: list) -> tuple[list[NetworkNode], list[dict]]:
+    """
+    Пакетное создание звеньев сети в одной транзакции.
+
+    Каждый элемент проверяется сериализатором (включая NetworkNodeValidator),
+    поставщики и телефоны проверяются одним запросом на весь пакет, уровни
+    и пути вычисляются в памяти в топологическом порядке, а запись идёт
+    через bulk_create по одному слою иерархии за раз.
+    Если хотя бы один элемент невалиден, ничего не записывается и
+    возвращается список ошибок по индексам элементов.
+    """
+    errors = {}
+    valid = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = {"non_field_errors": ["Ожидался объект звена сети."]}
+            continue
+        serializer = NetworkNodeBatchItemSerializer(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+
+    temp_index = {}
+    for index, item in enumerate(items):
+        temp_id = _temp_id(item)
+        if temp_id is None:
+            continue
+        if str(temp_id) in temp_index:
+            errors.setdefault(index, {})["temp_id"] = [
+                "Временный id повторяется в пакете."
+            ]
+        else:
+            temp_index[str(temp_id)] = index
+
+    phones = {}
+    for index, data in valid.items():
+        if data.get("phone") and index not in errors:
+            phone = data["phone"].as_e164
+            if phone in phones:
+                errors.setdefault(index, {})["phone"] = [
+                    "Телефон повторяется в пакете."
+                ]
+            else:
+                phones[phone] = index
+    if phones:
+        taken = NetworkNode.objects.filter(phone__in=list(phones)).values_list(
+            "phone", flat=True
+        )
+        for phone in taken:
+            errors.setdefault(phones[phone.as_e164], {})["phone"] = [
+                "Звено сети с таким телефоном уже существует."
+            ]
+
+    supplier_ids = {
+        data["supplier"] for data in valid.values() if data.get("supplier") is not None
+    }
+    suppliers = NetworkNode.objects.only("id", "name", "level", "path").in_bulk(
+        supplier_ids
+    )
+    levels = _resolve_batch_levels(valid, suppliers, temp_index, errors)
+
+    if errors:
+        return [], [
+            {"index": index, "temp_id": _temp_id(items[index]), "errors": errors[index]}
+            for index in sorted(errors)
+        ]
+
+    nodes = {}
+    with transaction.atomic():
+        for level in sorted(set(levels.values())):
+            layer = []
+            for index in (i for i in valid if levels[i] == level):
+                data = dict(valid[index])
+                data.pop("temp_id", None)
+                supplier_temp_id = data.pop("supplier_temp_id", None)
+                supplier_id = data.pop("supplier", None)
+                if supplier_id is not None:
+                    supplier = suppliers[supplier_id]
+                elif supplier_temp_id:
+                    supplier = nodes[temp_index[supplier_temp_id]]
+                else:
+                    supplier = None
+                node = NetworkNode(**data, supplier=supplier, level=level)
+                node.path = supplier.subtree_prefix if supplier else PATH_SEPARATOR
+                nodes[index] = node
+                layer.append(node)
+            NetworkNode.objects.bulk_create(layer, batch_size=1000)
+    # bulk_create не вызывает сигналов
+    invalidate_network_cache()
+    return [nodes[index] for index in sorted(nodes)], []
+
+
+def upsert_products(items: list, batch_size: int = 1000) -> dict:
+    """
+    Пакетная вставка или обновление продуктов по ключу unique_product_per_node.
+
+    Строки проверяются без запросов к БД, звенья — одним запросом на весь
+    пакет. Запись идёт через bulk_create(update_conflicts=True), то есть
+    INSERT ... ON CONFLICT DO UPDATE: на каждую пачку приходится один запрос
+    существующих ключей (для подсчёта обновлённых) и один INSERT.
+    При повторе ключа в пакете применяется последняя строка.
+    """
+    errors = {}
+    rows = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = {"non_field_errors": ["Ожидался объект продукта."]}
+            continue
+        serializer = ProductUpsertSerializer(data=item)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            key = (data["network_node"], data["name"], data["model"])
+            if key in rows:
+                errors[rows[key][0]] = {
+                    "non_field_errors": ["Продукт повторяется в пакете."]
+                }
+            rows[key] = (index, data)
+        else:
+            errors[index] = serializer.errors
+
+    node_ids = {key[0] for key in rows}
+    existing_nodes = set(
+        NetworkNode.objects.filter(pk__in=node_ids).values_list("pk", flat=True)
+    )
+    for key, (index, data) in list(rows.items()):
+        if key[0] not in existing_nodes:
+            errors[index] = {"network_node": ["Звено сети не найдено."]}
+            del rows[key]
+
+    with transaction.atomic():
+        inserted, updated = upsert_product_rows(
+            {key: data["release_date"] for key, (index, data) in rows.items()},
+            batch_size=batch_size,
+        )
+    # bulk_create не вызывает сигналов
+    bump_generation()
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "rejected": len(errors),
+        "errors": [
+            {"index": index, "errors": errors[index]} for index in sorted(errors)
+        ],
+    }
+
+
+def upsert_product_rows(rows: dict, batch_size: int = 1000) -> tuple[int, int]:
+    """
+    INSERT ... ON CONFLICT DO UPDATE для уже проверенных строк
+    {(network_node_id, name, model): release_date}.
+
+    На каждую пачку — один запрос существующих ключей и один INSERT.
+    Возвращает количество вставленных и обновлённых продуктов.
+    """
+    inserted = updated = 0
+    keys = list(rows)
+    for start in range(0, len(keys), batch_size):
+        end = start + batch_size
+        batch = keys[start:end]
+        existing = set(
+            Product.objects.filter(
+                network_node_id__in={key[0] for key in batch},
+                name__in={key[1] for key in batch},
+                model__in={key[2] for key in batch},
+            ).values_list("network_node_id", "name", "model")
+        )
+        products = [
+            Product(
+                network_node_id=key[0],
+                name=key[1],
+                model=key[2],
+                release_date=rows[key],
+            )
+            for key in batch
+        ]
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=["network_node", "name", "model"],
+            update_fields=["release_date", "updated_at"],
+        )
+        touch_nodes({key[0] for key in batch})
+        batch_updated = len(existing.intersection(batch))
+        updated += batch_updated
+        inserted += len(batch) - batch_updated
+    return inserted, updated
+
+
+def touch_nodes(node_ids) -> None:
+    """Отмечает звенья изменёнными после массового изменения их продуктов"""
+    NetworkNode.objects.filter(pk__in=node_ids).update(updated_at=timezone.now())
+
+
+def _temp_id(item):
+    return item.get("temp_id") if isinstance(item, dict) else None
@@ -0,0 +1,83 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from network_nodes.cache import (
+    bump_generation,
+    invalidate_facets,
+    invalidate_network_cache,
+    invalidate_rollup,
+)
+from network_nodes.models import NetworkNode, Product
+from network_nodes.search import TABLE, install_search
+from network_nodes.services import detach_subtree, refresh_location_facets
+
+
+@receiver(post_delete, sender=NetworkNode)
+def relevel_orphaned_children(sender, instance, **kwargs):
+    """После удаления звена пересчитываем путь и уровень его потомков"""
+    detach_subtree(instance)
+    invalidate_network_cache()
+
+
+@receiver(post_save, sender=NetworkNode)
+def invalidate_rollup_on_change(sender, instance, created, **kwargs):
+    """
+    Сбрасываем кеш ответов при любом сохранении, агрегаты поддеревьев —
+    при изменении долга, поставщика, типа или названия
+    """
+    bump_generation()
+    if created or any(
+        instance.has_changed(field) for field in NetworkNode.TRACKED_FIELDS
+    ):
+        invalidate_rollup()
+
+
+@receiver(post_save, sender=NetworkNode)
+def refresh_facets_on_change(sender, instance, created, **kwargs):
+    """
+    Пересчитываем агрегаты только старого и нового города звена. Смена
+    поставщика меняет уровни всего поддерева, поэтому агрегаты сбрасываются
+    """
+    if not created and instance.has_changed("supplier_id"):
+        invalidate_facets()
+        return
+    fields = NetworkNode.LOCATION_FIELDS + ("node_type", "debt_to_supplier")
+    if not created and not any(instance.has_changed(field) for field in fields):
+        return
+    locations = {(instance.country_code, instance.city_key)}
+    if not created:
+        loaded = instance.loaded_location()
+        if loaded is None:
+            invalidate_facets()
+            return
+        locations.add(loaded)
+    # пересчёт после фиксации транзакции, чтобы не закешировать откатываемое
+    transaction.on_commit(lambda: refresh_location_facets(locations))
+
+
+@receiver(post_save, sender=Product)
+def invalidate_responses_on_product_change(sender, **kwargs):
+    """
+    Продукты входят в ответы API звеньев. Удаляются они только каскадно вместе
+    со звеном, поэтому post_delete не нужен: он отключил бы быстрое каскадное
+    удаление продуктов без загрузки их в память
+    """
+    bump_generation()
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, app_config, using, **kwargs):
+    """
+    SQLite пересоздаёт таблицу при изменении её схемы и теряет триггеры
+    поискового индекса, поэтому после миграций восстанавливаем их
+    """
+    connection = connections[using]
+    if (
+        app_config.name != "network_nodes"
+        or connection.vendor != "sqlite"
+        or TABLE not in connection.introspection.table_names()
+    ):
+        return
+    with connection.schema_editor() as schema_editor:
+        install_search(schema_editor)
@@ -1,13 +1,47 @@
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
 from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from djangorestframework_camel_case import util
 from phonenumber_field.phonenumber import PhoneNumber
 from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
 from rest_framework.test import APITestCase
 
+from config import renderers
+from config.camel_case import CamelCaseJSONParser, CamelCaseJSONRenderer, camelize, underscoreize
+from network_nodes.bench import compare_results, measure_camel_case, measure_serialization, run_benchmarks
+from network_nodes.cache import get_cached_facets, get_cached_rollup
+from network_nodes.importers import ImportCheckpoint
+from network_nodes.loadtest import LoadTest, parse_mix
+from network_nodes.management.commands.fill_db import fill_db
 from network_nodes.models import NetworkNode, Product
-from network_nodes.serializers import NetworkNodeSerializer, ProductSerializer
+from network_nodes.readers import NetworkNodeReader
+from network_nodes.serializers import NetworkNodeExportSerializer, NetworkNodeSerializer, ProductSerializer
+from network_nodes.services import get_location_facets
 from network_nodes.validators import NetworkNodeValidator
+from users.models import OutgoingEmail, User
+from users.tasks import drain_outbox_task
 
 
 class NetworkNodeModelTest(TestCase):
@@ -376,4 +410,1549 @@ class NetworkNodeValidatorTest(TestCase):
         self.assertEqual(
             str(context.exception.detail[0]),
             "Задолженность не может быть отрицательной."
-        )
\ No newline at end of file
+        )
+
+
+def create_staff_user():
+    return User.objects.create_user(
+        email="staff@example.com",
+        password="password123",
+        is_active=True,
+        is_staff=True,
+    )
+
+
+def create_node(name, node_type, supplier=None, **extra):
+    """Звено сети с адресом по умолчанию; email строится из названия"""
+    fields = {
+        "email": f"{name.replace(' ', '').lower()}@example.com",
+        "country": "Russia",
+        "city": "Moscow",
+        "house_number": "1",
+        **extra,
+    }
+    return NetworkNode.objects.create(
+        name=name, node_type=node_type, supplier=supplier, **fields
+    )
+
+
+class StaffAPITestCase(APITestCase):
+    """Тесты API от имени сотрудника; кеш ответов очищается перед каждым тестом"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_staff_user()
+        self.client.force_authenticate(user=self.user)
+
+
+class NetworkNodeListPaginationTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(15):
+            NetworkNode.objects.create(
+                name=f"Factory {i}",
+                node_type=NetworkNode.FACTORY,
+                email=f"factory{i}@example.com",
+                country="Russia",
+                city="Moscow",
+                house_number=str(i),
+            )
+
+    def test_cursor_pagination_by_default(self):
+        """По умолчанию список отдается с курсорами и без COUNT"""
+        response = self.client.get("/network-nodes/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn("count", data)
+        self.assertEqual(len(data["results"]), 10)
+        self.assertIn("cursor=", data["next"])
+        self.assertIsNone(data["previous"])
+
+    def test_cursor_pages_do_not_overlap(self):
+        """Вторая страница по курсору продолжает первую без пропусков"""
+        first = self.client.get("/network-nodes/").json()
+        second = self.client.get(first["next"]).json()
+        ids = [item["id"] for item in first["results"] + second["results"]]
+        self.assertEqual(len(ids), 15)
+        self.assertEqual(len(set(ids)), 15)
+        self.assertIsNone(second["next"])
+        self.assertIn("cursor=", second["previous"])
+
+    def test_page_number_mode_is_opt_in(self):
+        """Параметр ?page= включает постраничный режим с общим количеством"""
+        response = self.client.get("/network-nodes/?page=2")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 15)
+        self.assertEqual(len(data["results"]), 5)
+
+
+class NetworkNodeQueryCountTest(StaffAPITestCase):
+    """
+    Регрессионные тесты: количество запросов не должно зависеть от размера страницы.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        for i in range(20):
+            retail = NetworkNode.objects.create(
+                name=f"Retail {i}",
+                node_type=NetworkNode.RETAIL,
+                email=f"retail{i}@example.com",
+                country="Russia",
+                city="Moscow",
+                house_number=str(i),
+                supplier=self.factory,
+            )
+            for j in range(2):
+                Product.objects.create(
+                    name=f"Product {j}",
+                    model=f"M-{i}-{j}",
+                    release_date="2024-01-01",
+                    network_node=retail,
+                )
+
+    def _count_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data=data, format="json")
+        self.assertLess(response.status_code, 300, response.content)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        """Список: одинаковое число запросов для страниц разного размера"""
+        small = self._count_queries("get", "/network-nodes/?page_size=2")
+        large = self._count_queries("get", "/network-nodes/?page_size=20")
+        self.assertEqual(small, large)
+        paged_small = self._count_queries("get", "/network-nodes/?page=1&page_size=2")
+        paged_large = self._count_queries("get", "/network-nodes/?page=1&page_size=20")
+        self.assertEqual(paged_small, paged_large)
+
+    def test_retrieve_update_create_query_counts(self):
+        """Получение, обновление и создание выполняются фиксированным числом запросов"""
+        retail = NetworkNode.objects.filter(node_type=NetworkNode.RETAIL).first()
+        # время изменения для ETag, звено с поставщиком, продукты
+        with self.assertNumQueries(3):
+            self.client.get(f"/network-nodes/{retail.pk}/")
+        update_queries = self._count_queries(
+            "patch", f"/network-nodes/update/{retail.pk}/", {"name": "Retail New"}
+        )
+        # переименование отмечает изменёнными покупателей звена
+        self.assertEqual(update_queries, 5)
+        create_queries = self._count_queries(
+            "post",
+            "/network-nodes/create/",
+            {
+                "name": "Retail X",
+                "nodeType": NetworkNode.RETAIL,
+                "email": "x@example.com",
+                "country": "Russia",
+                "city": "Moscow",
+                "houseNumber": "5",
+                "supplier": self.factory.pk,
+            },
+        )
+        self.assertEqual(create_queries, 3)
+
+
+class NetworkNodeHierarchyPathTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        self.other_factory = create_node("Other Factory", NetworkNode.FACTORY)
+        self.retail = create_node("Retail", NetworkNode.RETAIL, self.factory)
+        self.individual = create_node("Individual", NetworkNode.INDIVIDUAL, self.retail)
+        self.foreign = create_node("Foreign", NetworkNode.RETAIL, self.other_factory)
+
+    def test_path_is_built_from_suppliers(self):
+        """Путь звена состоит из идентификаторов всех поставщиков"""
+        self.assertEqual(self.factory.path, "/")
+        self.assertEqual(self.retail.path, f"/{self.factory.pk}/")
+        self.assertEqual(
+            self.individual.path, f"/{self.factory.pk}/{self.retail.pk}/"
+        )
+
+    def test_descendants_of(self):
+        """Поддерево выбирается по префиксу пути"""
+        descendants = NetworkNode.objects.descendants_of(self.factory)
+        self.assertEqual(
+            set(descendants.values_list("id", flat=True)),
+            {self.retail.pk, self.individual.pk},
+        )
+
+    def test_supplier_change_moves_subtree(self):
+        """Смена поставщика переносит путь и уровень всех потомков"""
+        retail = NetworkNode.objects.get(pk=self.retail.pk)
+        retail.supplier = self.foreign
+        retail.save()
+        self.individual.refresh_from_db()
+        self.assertEqual(retail.level, 2)
+        self.assertEqual(
+            self.individual.path,
+            f"/{self.other_factory.pk}/{self.foreign.pk}/{self.retail.pk}/",
+        )
+        self.assertEqual(self.individual.level, 3)
+
+    def test_subtree_endpoint(self):
+        """Эндпоинт поддерева возвращает всех потомков завода"""
+        response = self.client.get(f"/network-nodes/{self.factory.pk}/subtree/")
+        self.assertEqual(response.status_code, 200)
+        ids = [item["id"] for item in response.json()]
+        self.assertEqual(ids, [self.retail.pk, self.individual.pk])
+
+    def test_subtree_endpoint_not_found(self):
+        """Несуществующее звено возвращает 404"""
+        response = self.client.get("/network-nodes/999999/subtree/")
+        self.assertEqual(response.status_code, 404)
+
+
+class NetworkNodeRelevelTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="password123", is_active=True
+        )
+        self.admin.groups.add(Group.objects.create(name="admins"))
+        self.client.force_authenticate(user=self.admin)
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        self.retail = create_node("Retail", NetworkNode.RETAIL, self.factory)
+        self.individual = create_node("Individual", NetworkNode.INDIVIDUAL, self.retail)
+        self.other = create_node("Other", NetworkNode.INDIVIDUAL, self.retail)
+
+    def test_delete_relevels_children(self):
+        """Удаление поставщика через API делает детей корнями уровня 0"""
+        self.retail.delete()
+        for node in (self.individual, self.other):
+            node.refresh_from_db()
+            self.assertIsNone(node.supplier)
+            self.assertEqual(node.level, 0)
+            self.assertEqual(node.path, "/")
+
+    def test_delete_relevels_whole_subtree(self):
+        """Удаление завода сдвигает уровни всего поддерева"""
+        self.factory.delete()
+        self.retail.refresh_from_db()
+        self.individual.refresh_from_db()
+        self.assertEqual((self.retail.level, self.retail.path), (0, "/"))
+        self.assertEqual(
+            (self.individual.level, self.individual.path), (1, f"/{self.retail.pk}/")
+        )
+
+    def test_queryset_delete_of_ancestor_and_descendant(self):
+        """Одновременное удаление предка и потомка оставляет корректные уровни"""
+        NetworkNode.objects.filter(pk__in=[self.factory.pk, self.retail.pk]).delete()
+        self.individual.refresh_from_db()
+        self.assertEqual((self.individual.level, self.individual.path), (0, "/"))
+
+    def test_relevel_command_repairs_stale_levels(self):
+        """Команда relevel_nodes исправляет устаревшие уровни и пути"""
+        NetworkNode.objects.filter(pk=self.retail.pk).update(level=5, path="/999/")
+        NetworkNode.objects.filter(pk=self.individual.pk).update(level=0, path="/")
+        NetworkNode.objects.filter(pk=self.factory.pk).update(level=3)
+        call_command("relevel_nodes", batch_size=2, stdout=StringIO())
+        expected = {
+            self.factory.pk: (0, "/"),
+            self.retail.pk: (1, f"/{self.factory.pk}/"),
+            self.individual.pk: (2, f"/{self.factory.pk}/{self.retail.pk}/"),
+            self.other.pk: (2, f"/{self.factory.pk}/{self.retail.pk}/"),
+        }
+        actual = {
+            pk: (level, path)
+            for pk, level, path in NetworkNode.objects.values_list("pk", "level", "path")
+        }
+        self.assertEqual(actual, expected)
+
+
+class SubtreeRollupTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        self.retail = create_node(
+            "Retail", NetworkNode.RETAIL, self.factory, debt_to_supplier=Decimal("100.50")
+        )
+        self.retail2 = create_node(
+            "Retail2", NetworkNode.RETAIL, self.factory, debt_to_supplier=Decimal("50")
+        )
+        self.individual = create_node(
+            "Individual", NetworkNode.INDIVIDUAL, self.retail, debt_to_supplier=Decimal("25")
+        )
+
+    def _rollup(self):
+        response = self.client.get("/network-nodes/rollup/")
+        self.assertEqual(response.status_code, 200)
+        return {item["id"]: item for item in response.json()}
+
+    def test_rollup_aggregates_subtrees(self):
+        """Агрегаты считаются по всем потомкам завода и розничной сети"""
+        rollup = self._rollup()
+        self.assertEqual(set(rollup), {self.factory.pk, self.retail.pk, self.retail2.pk})
+        factory = rollup[self.factory.pk]
+        self.assertEqual(factory["subtreeDebt"], "175.50")
+        self.assertEqual(factory["subtreeSize"], 3)
+        self.assertEqual(factory["nodesPerLevel"], {"1": 2, "2": 1})
+        retail = rollup[self.retail.pk]
+        self.assertEqual(retail["subtreeDebt"], "25.00")
+        self.assertEqual(retail["nodesPerLevel"], {"2": 1})
+        self.assertEqual(rollup[self.retail2.pk]["subtreeSize"], 0)
+
+    def test_rollup_is_cached(self):
+        """Повторный запрос отдается из кеша без обращений к БД"""
+        self._rollup()
+        with self.assertNumQueries(0):
+            self._rollup()
+
+    def test_rollup_invalidated_on_debt_change(self):
+        """Изменение задолженности сбрасывает кеш"""
+        self._rollup()
+        self.individual.debt_to_supplier = Decimal("75")
+        self.individual.save()
+        self.assertEqual(self._rollup()[self.factory.pk]["subtreeDebt"], "225.50")
+
+    def test_rollup_invalidated_on_supplier_change_and_delete(self):
+        """Смена поставщика и удаление звена сбрасывают кеш"""
+        self._rollup()
+        individual = NetworkNode.objects.get(pk=self.individual.pk)
+        individual.supplier = self.retail2
+        individual.save()
+        self.assertEqual(self._rollup()[self.retail2.pk]["subtreeSize"], 1)
+        self.retail2.delete()
+        rollup = self._rollup()
+        self.assertEqual(rollup[self.factory.pk]["subtreeSize"], 1)
+        self.assertEqual(rollup[self.factory.pk]["subtreeDebt"], "100.50")
+
+    def test_rollup_unchanged_save_keeps_cache(self):
+        """Сохранение без изменений отслеживаемых полей не сбрасывает кеш"""
+        self._rollup()
+        node = NetworkNode.objects.get(pk=self.individual.pk)
+        node.city = "Kazan"
+        node.save()
+        self.assertIsNotNone(get_cached_rollup())
+
+
+class NetworkNodeBatchCreateTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+
+    def _item(self, name, node_type, **extra):
+        return {
+            "name": name,
+            "nodeType": node_type,
+            "email": f"{name.lower()}@example.com",
+            "country": "Russia",
+            "city": "Moscow",
+            "houseNumber": "1",
+            **extra,
+        }
+
+    def test_batch_create_with_temp_ids(self):
+        """Звенья пакета ссылаются друг на друга через временные id"""
+        items = [
+            self._item("Individual", NetworkNode.INDIVIDUAL, supplierTempId="r1"),
+            self._item("Retail", NetworkNode.RETAIL, tempId="r1", supplier=self.factory.pk),
+            self._item("NewFactory", NetworkNode.FACTORY, tempId="f2"),
+            self._item("Retail2", NetworkNode.RETAIL, supplierTempId="f2"),
+        ]
+        response = self.client.post("/network-nodes/batch-create/", items, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        data = response.json()
+        self.assertEqual(data["created"], 4)
+        ids = [result["id"] for result in data["results"]]
+        individual, retail, new_factory, retail2 = (
+            NetworkNode.objects.get(pk=pk) for pk in ids
+        )
+        self.assertEqual(retail.supplier, self.factory)
+        self.assertEqual(individual.supplier, retail)
+        self.assertEqual(individual.level, 2)
+        self.assertEqual(individual.path, f"/{self.factory.pk}/{retail.pk}/")
+        self.assertEqual(new_factory.level, 0)
+        self.assertEqual(retail2.path, f"/{new_factory.pk}/")
+
+    def test_batch_create_ndjson(self):
+        """Пакет можно передать в формате NDJSON"""
+        body = "\n".join(
+            json.dumps(self._item(f"Retail{i}", NetworkNode.RETAIL, supplier=self.factory.pk))
+            for i in range(3)
+        )
+        response = self.client.post(
+            "/network-nodes/batch-create/", body, content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.factory.children.count(), 3)
+
+    def test_batch_create_reports_item_errors(self):
+        """Ошибки возвращаются по индексам, а пакет не записывается"""
+        retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Russia",
+            city="Moscow",
+            house_number="1",
+            supplier=self.factory,
+        )
+        individual = NetworkNode.objects.create(
+            name="Individual",
+            node_type=NetworkNode.INDIVIDUAL,
+            email="individual@example.com",
+            country="Russia",
+            city="Moscow",
+            house_number="1",
+            supplier=retail,
+        )
+        items = [
+            self._item("Ok", NetworkNode.RETAIL, supplier=self.factory.pk),
+            self._item("X", NetworkNode.RETAIL),
+            self._item("BadFactory", NetworkNode.FACTORY, supplier=self.factory.pk),
+            self._item("TooDeep", NetworkNode.INDIVIDUAL, supplier=individual.pk),
+            self._item("Orphan", NetworkNode.RETAIL, supplierTempId="missing"),
+            self._item("Missing", NetworkNode.RETAIL, supplier=999999),
+        ]
+        response = self.client.post("/network-nodes/batch-create/", items, format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = {error["index"]: error["errors"] for error in response.json()["errors"]}
+        self.assertEqual(set(errors), {1, 2, 3, 4, 5})
+        self.assertEqual(
+            errors[1]["nonFieldErrors"],
+            ["Название звена сети должно содержать минимум 2 символа."],
+        )
+        self.assertEqual(errors[2]["nonFieldErrors"], ["Завод не может иметь поставщика"])
+        self.assertEqual(errors[3]["nonFieldErrors"], ["Максимальный уровень иерархии - 2"])
+        self.assertFalse(NetworkNode.objects.filter(name="Ok").exists())
+
+    def test_batch_create_detects_cycles(self):
+        """Циклические ссылки через временные id отклоняются"""
+        items = [
+            self._item("A", NetworkNode.RETAIL, tempId="a", supplierTempId="b"),
+            self._item("B", NetworkNode.RETAIL, tempId="b", supplierTempId="a"),
+        ]
+        response = self.client.post("/network-nodes/batch-create/", items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()["errors"]), 2)
+
+    def test_batch_create_query_count_does_not_grow(self):
+        """Число запросов не зависит от количества звеньев в пакете"""
+        def run(size, offset):
+            items = [
+                self._item(f"Retail{offset + i}", NetworkNode.RETAIL, supplier=self.factory.pk)
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    "/network-nodes/batch-create/", items, format="json"
+                )
+            self.assertEqual(response.status_code, 201)
+            return len(context.captured_queries)
+
+        self.assertEqual(run(2, 0), run(50, 100))
+
+
+class ProductBulkUpsertTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        Product.objects.create(
+            name="Phone",
+            model="P1",
+            release_date="2023-01-01",
+            network_node=self.factory,
+        )
+
+    def _row(self, name, model, release_date="2024-01-01", node=None):
+        return {
+            "name": name,
+            "model": model,
+            "releaseDate": release_date,
+            "networkNode": node or self.factory.pk,
+        }
+
+    def test_upsert_inserts_updates_and_rejects(self):
+        """Новые продукты вставляются, существующие обновляются, ошибочные отклоняются"""
+        rows = [
+            self._row("Phone", "P1", "2024-05-05"),
+            self._row("Laptop", "L1"),
+            self._row("Tablet", "T1", node=999999),
+            {"name": "Broken"},
+        ]
+        response = self.client.post(
+            "/network-nodes/products/bulk-upsert/", rows, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual((data["inserted"], data["updated"], data["rejected"]), (1, 1, 2))
+        self.assertEqual([error["index"] for error in data["errors"]], [2, 3])
+        self.assertEqual(
+            str(Product.objects.get(name="Phone").release_date), "2024-05-05"
+        )
+        self.assertTrue(Product.objects.filter(name="Laptop").exists())
+
+    def test_upsert_query_count_does_not_grow(self):
+        """Число запросов зависит от числа пачек, а не строк"""
+        def run(size, prefix):
+            rows = [self._row(f"{prefix}{i}", "M") for i in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    "/network-nodes/products/bulk-upsert/", rows, format="json"
+                )
+            self.assertEqual(response.json()["inserted"], size)
+            return len(context.captured_queries)
+
+        # 150 строк помещаются в один INSERT с учётом лимита параметров SQLite
+        self.assertEqual(run(2, "a"), run(150, "b"))
+
+
+class NetworkNodeExportTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        self.retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Kazakhstan",
+            city="Almaty",
+            house_number="2",
+            supplier=self.factory,
+            debt_to_supplier=Decimal("10.50"),
+        )
+        Product.objects.create(
+            name="Phone", model="P1", release_date="2024-01-01", network_node=self.retail
+        )
+
+    def _content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """NDJSON: по одному звену в строке, ключи в camelCase"""
+        response = self.client.get("/network-nodes/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.factory.pk, self.retail.pk])
+        self.assertEqual(rows[1]["supplierName"], "Factory")
+        self.assertEqual(rows[1]["debtToSupplier"], "10.50")
+        self.assertNotIn("products", rows[1])
+
+    def test_export_csv_with_products_and_filter(self):
+        """CSV с продуктами учитывает фильтры списка"""
+        response = self.client.get(
+            "/network-nodes/export/?export_format=csv&products=true&country=kaz"
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["name"], "Retail")
+        self.assertIn('"name": "Phone"', rows[0]["products"])
+
+    def test_export_csv_includes_nodes_without_supplier(self):
+        """У завода нет supplierName: колонка остаётся пустой, выгрузка не обрывается"""
+        response = self.client.get("/network-nodes/export/?export_format=csv")
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual([row["name"] for row in rows], ["Factory", "Retail"])
+        self.assertEqual(rows[0]["supplierName"], "")
+        self.assertEqual(rows[1]["supplierName"], "Factory")
+
+    def test_export_requires_staff(self):
+        """Выгрузка доступна только сотрудникам"""
+        user = User.objects.create_user(
+            email="user@example.com", password="password123", is_active=True
+        )
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/network-nodes/export/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_unknown_format(self):
+        """Неизвестный формат выгрузки отклоняется"""
+        response = self.client.get("/network-nodes/export/?export_format=xml")
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportNetworkCommandTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _file(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def _nodes_csv(self):
+        return self._file(
+            "nodes.csv",
+            "ref,supplier_ref,name,node_type,email,country,city,house_number,phone\n"
+            "r1,f1,Retail,retail,r1@example.com,Russia,Moscow,1,+79990000001\n"
+            "f1,,Factory,factory,f1@example.com,Russia,Moscow,1,\n"
+            "e1,r1,Entrepreneur,individual,e1@example.com,Russia,Moscow,2,\n"
+            "x1,e1,Too deep,retail,x1@example.com,Russia,Moscow,3,\n"
+            "o1,missing,Orphan,retail,o1@example.com,Russia,Moscow,4,\n"
+            "d1,f1,Duplicate phone,retail,d1@example.com,Russia,Moscow,5,+79990000001\n",
+        )
+
+    def _import(self, **options):
+        if "checkpoint" not in options:
+            options["checkpoint"] = self._file("checkpoint.json", "{}")
+        options.setdefault("batch_size", 100)
+        out = StringIO()
+        call_command("import_network", stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_nodes_and_products(self):
+        """Звенья связываются по ссылкам независимо от порядка строк, продукты upsert-ятся"""
+        products = self._file(
+            "products.ndjson",
+            '{"nodeRef": "r1", "name": "Phone", "model": "P1", "releaseDate": "2024-01-01"}\n'
+            '{"nodeRef": "r1", "name": "Phone", "model": "P1", "releaseDate": "2024-02-02"}\n'
+            '{"nodeRef": "nope", "name": "Phone", "model": "P2", "releaseDate": "2024-01-01"}\n'
+            '{"nodeRef": "f1", "name": "Laptop", "model": "L1", "releaseDate": "bad"}\n',
+        )
+        out = self._import(nodes=self._nodes_csv(), products=products)
+
+        self.assertIn("Звеньев создано: 3, отклонено: 3", out)
+        self.assertIn("Продуктов добавлено: 1, обновлено: 0, отклонено: 2", out)
+        factory = NetworkNode.objects.get(name="Factory")
+        retail = NetworkNode.objects.get(name="Retail")
+        entrepreneur = NetworkNode.objects.get(name="Entrepreneur")
+        self.assertEqual((retail.supplier, retail.level), (factory, 1))
+        self.assertEqual(entrepreneur.path, f"/{factory.pk}/{retail.pk}/")
+        self.assertEqual(entrepreneur.level, 2)
+        product = Product.objects.get()
+        self.assertEqual(str(product.release_date), "2024-02-02")
+        self.assertEqual(product.network_node, retail)
+
+    def test_import_resumes_from_checkpoint(self):
+        """При --resume уже записанные строки пропускаются, ссылки берутся из контрольной точки"""
+        nodes = self._nodes_csv()
+        checkpoint = self._file("checkpoint.json", "{}")
+        self._import(nodes=nodes, checkpoint=checkpoint)
+        with open(checkpoint, encoding="utf-8") as file:
+            state = json.load(file)
+        self.assertEqual(state["nodes_line"], 6)
+        # ссылки не переписываются с каждой пачкой, а дописываются в журнал
+        self.assertNotIn("refs", state)
+        with open(f"{checkpoint}.refs", encoding="utf-8") as file:
+            self.assertEqual({json.loads(line)[0] for line in file}, {"f1", "r1", "e1"})
+
+        products = self._file(
+            "products.csv",
+            "node_ref,name,model,release_date\n"
+            "f1,Phone,P1,2024-01-01\n"
+            "e1,Laptop,L1,2024-01-01\n",
+        )
+        out = self._import(
+            nodes=nodes, products=products, checkpoint=checkpoint, resume=True
+        )
+        self.assertIn("Звеньев создано: 0", out)
+        self.assertEqual(NetworkNode.objects.count(), 3)
+        self.assertEqual(
+            set(Product.objects.values_list("network_node__name", flat=True)),
+            {"Factory", "Entrepreneur"},
+        )
+
+    def test_checkpoint_appends_refs_per_batch(self):
+        """Журнал ссылок дописывается пачками, без --resume начинается заново"""
+        path = os.path.join(self.tmp.name, "state.json")
+        checkpoint = ImportCheckpoint(path)
+        checkpoint.add_refs({"a": [1, 0, "/"]})
+        checkpoint.add_refs({"b": [2, 1, "/1/"]})
+        checkpoint.save()
+        with open(f"{path}.refs", encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 2)
+
+        resumed = ImportCheckpoint(path)
+        resumed.load()
+        self.assertEqual(resumed.refs, {"a": [1, 0, "/"], "b": [2, 1, "/1/"]})
+
+        ImportCheckpoint(path).save()
+        fresh = ImportCheckpoint(path)
+        fresh.load()
+        self.assertEqual(fresh.refs, {})
+
+
+class FillDbCommandTest(TestCase):
+    def _fill(self, **options):
+        call_command("fill_db", stdout=StringIO(), **options)
+        return list(
+            NetworkNode.objects.order_by("id").values_list(
+                "name", "country", "city", "debt_to_supplier", "level"
+            )
+        )
+
+    def test_fill_db_builds_hierarchy(self):
+        """Каждый завод получает fanout сетей, каждая сеть — fanout ИП, уровни и пути заполнены"""
+        self._fill(factories=3, fanout=2, products_per_node=2, batch_size=7)
+
+        self.assertEqual(NetworkNode.objects.count(), 3 * (1 + 2 + 4))
+        self.assertEqual(
+            NetworkNode.objects.filter(level=2, node_type=NetworkNode.INDIVIDUAL).count(),
+            12,
+        )
+        individual = NetworkNode.objects.filter(level=2).select_related("supplier").first()
+        self.assertEqual(
+            individual.path,
+            f"/{individual.supplier.supplier_id}/{individual.supplier_id}/",
+        )
+        self.assertGreaterEqual(Product.objects.count(), NetworkNode.objects.count())
+
+    def test_fill_db_is_reproducible(self):
+        """Одинаковый seed даёт одинаковые данные"""
+        first = self._fill(factories=2, fanout=3, seed=7)
+        NetworkNode.objects.all().delete()
+        second = self._fill(factories=2, fanout=3, seed=7)
+        self.assertEqual(
+            [row[1:] for row in first], [row[1:] for row in second]
+        )
+
+
+class BenchTest(TestCase):
+    def test_run_benchmarks_collects_metrics(self):
+        """Каждый сценарий выполняется успешно и возвращает метрики"""
+        fill_db(factories=2, fanout=2)
+        results = run_benchmarks(["list_10", "retrieve", "create", "update"], 2, 0)
+        self.assertEqual(set(results), {"list_10", "retrieve", "create", "update"})
+        for metrics in results.values():
+            self.assertGreater(metrics["p95_ms"], 0)
+            self.assertGreaterEqual(metrics["p95_ms"], metrics["p50_ms"])
+            # кеш ответов не участвует в замере
+            self.assertGreater(metrics["queries"], 0)
+
+    def test_register_does_not_publish_tasks(self):
+        """Сценарий регистрации не обращается к брокеру"""
+        with mock.patch.object(drain_outbox_task, "apply_async") as apply_async:
+            results = run_benchmarks(["register"], 2, 0)
+        apply_async.assert_not_called()
+        self.assertGreater(results["register"]["queries"], 0)
+        # письма остаются в очереди: два замера времени и один подсчёт запросов
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+
+    def test_compare_results_reports_regressions(self):
+        """Регрессией считается рост времени или памяти сверх порога и любой рост числа запросов"""
+        baseline = {"list_10": {"p50_ms": 10, "p95_ms": 20, "queries": 3, "memory_kib": 100}}
+        results = {"list_10": {"p50_ms": 11, "p95_ms": 30, "queries": 4, "memory_kib": 100}}
+        self.assertEqual(
+            compare_results(results, baseline, threshold=0.2),
+            ["list_10.p95_ms: 20 -> 30", "list_10.queries: 3 -> 4"],
+        )
+
+    def test_measure_serialization(self):
+        """Замер сериализации сравнивает сериализатор DRF и чтение через values()"""
+        fill_db(factories=2, fanout=2, products_per_node=2)
+        result = measure_serialization(rows=10, iterations=2)
+        self.assertGreater(result["serializer_p50_ms"], 0)
+        self.assertGreater(result["reader_p50_ms"], 0)
+        self.assertGreater(result["speedup"], 0)
+
+    def test_measure_camel_case(self):
+        """Замер camelCase сравнивает библиотеку и рендерер с кешем ключей"""
+        fill_db(factories=1, fanout=2)
+        result = measure_camel_case(rows=10, iterations=2)
+        self.assertEqual(result["rows"], 7)
+        self.assertGreater(result["render_speedup"], 0)
+        self.assertGreater(result["parse_speedup"], 0)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def setUp(self):
+        create_staff_user()
+        create_node("Factory", NetworkNode.FACTORY)
+
+    def test_load_test_against_live_server(self):
+        """Прогон по keep-alive соединениям собирает задержки и статусы по типам запросов"""
+        load_test = LoadTest(
+            url=self.live_server_url,
+            email="staff@example.com",
+            password="password123",
+            mix=parse_mix("list=2,retrieve=2,update=1"),
+            connections=2,
+            requests=20,
+            seed=1,
+        )
+        report = asyncio.run(load_test.run())
+
+        self.assertEqual(report["requests"], 20)
+        self.assertEqual(report["error_rate"], 0)
+        for item in report["scenarios"].values():
+            self.assertEqual(sum(item["histogram"].values()), item["requests"])
+        self.assertEqual(NetworkNode.objects.get().street[:11], "Нагрузочная")
+
+    def test_load_test_command_prints_report(self):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            url=self.live_server_url,
+            email="staff@example.com",
+            password="password123",
+            mix="list=1",
+            connections=1,
+            requests=3,
+            stdout=out,
+        )
+        self.assertIn("запросов: 3", out.getvalue())
+        self.assertIn("ошибок: 0.00%", out.getvalue())
+
+    def test_parse_mix_rejects_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            parse_mix("list=1,delete=1")
+
+
+class NetworkNodeSearchTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkNode.objects.create(
+            name="Завод Электроника",
+            node_type=NetworkNode.FACTORY,
+            email="factory@example.com",
+            country="Россия",
+            city="Москва",
+            house_number="1",
+        )
+        self.retail = NetworkNode.objects.create(
+            name="Техномаркет",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Казахстан",
+            city="Электросталь",
+            house_number="2",
+            supplier=self.factory,
+        )
+        NetworkNode.objects.create(
+            name="ИП Иванов",
+            node_type=NetworkNode.INDIVIDUAL,
+            email="ip@example.com",
+            country="Беларусь",
+            city="Минск",
+            house_number="3",
+            supplier=self.retail,
+        )
+
+    def _search(self, query):
+        response = self.client.get("/network-nodes/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [node["name"] for node in response.data["results"]]
+
+    def test_search_substring_ranked_by_relevance(self):
+        """Подстрока ищется в названии, городе и стране, совпадение в названии выше"""
+        self.assertEqual(self._search("электр"), ["Завод Электроника", "Техномаркет"])
+        self.assertEqual(self._search("ИВАНОВ"), ["ИП Иванов"])
+        self.assertEqual(self._search("захстан"), ["Техномаркет"])
+        self.assertEqual(self._search("нет такого"), [])
+
+    def test_search_index_follows_changes(self):
+        """Изменения звеньев, в том числе массовые, сразу попадают в индекс"""
+        NetworkNode.objects.filter(pk=self.retail.pk).update(name="Сеть Альфа")
+        self.assertEqual(self._search("альфа"), ["Сеть Альфа"])
+        self.assertEqual(self._search("техно"), [])
+        self.retail.delete()
+        self.assertEqual(self._search("альфа"), [])
+
+    def test_short_search_and_page_mode(self):
+        """Короткие запросы ищутся без индекса, результаты поиска отдаются постранично"""
+        response = self.client.get("/network-nodes/", {"search": "ИП"})
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["name"], "ИП Иванов")
+
+    def test_admin_search(self):
+        """Поиск в админке использует тот же индекс"""
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="password123", is_active=True
+        )
+        self.client.force_login(admin)
+        response = self.client.get("/admin/network_nodes/networknode/", {"q": "электр"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [node.name for node in response.context["cl"].result_list],
+            ["Завод Электроника", "Техномаркет"],
+        )
+
+
+class ResponseCacheTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+
+    def test_retrieve_is_cached_until_node_changes(self):
+        """Повторный запрос отдаётся из кеша без запросов к БД, изменение звена сбрасывает кеш"""
+        url = f"/network-nodes/{self.factory.pk}/"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        response = self.client.patch(
+            f"/network-nodes/update/{self.factory.pk}/", {"city": "Kazan"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["city"], "Kazan")
+
+    def test_list_cache_keyed_by_params_and_reset_by_products(self):
+        """Ключ учитывает параметры запроса, изменение продуктов сбрасывает кеш списка"""
+        self.assertEqual(self.client.get("/network-nodes/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/network-nodes/?country=rus")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/network-nodes/")["X-Cache"], "HIT")
+
+        self.client.post(
+            "/network-nodes/products/bulk-upsert/",
+            [
+                {
+                    "name": "Phone",
+                    "model": "P1",
+                    "releaseDate": "2024-01-01",
+                    "networkNode": self.factory.pk,
+                }
+            ],
+            format="json",
+        )
+        response = self.client.get("/network-nodes/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["products"][0]["name"], "Phone")
+
+    def test_cache_stats(self):
+        """Счётчики попаданий и промахов доступны через API"""
+        url = f"/network-nodes/{self.factory.pk}/"
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url)
+        response = self.client.get("/network-nodes/cache-stats/")
+        self.assertEqual(response.data["hits"], 2)
+        self.assertEqual(response.data["misses"], 1)
+        self.assertEqual(response.data["hit_ratio"], 0.6667)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    )
+    def test_without_shared_cache_responses_are_not_cached(self):
+        """Без общего кеша (DummyCache) ответы, агрегаты и счётчики работают без кеша"""
+        url = f"/network-nodes/{self.factory.pk}/"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/network-nodes/rollup/").status_code, 200)
+        self.assertEqual(self.client.get("/network-nodes/facets/").status_code, 200)
+        self.client.patch(
+            f"/network-nodes/update/{self.factory.pk}/", {"city": "Kazan"}, format="json"
+        )
+        self.assertEqual(self.client.get(url).data["city"], "Kazan")
+
+
+class ConditionalGetTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = create_node("Factory", NetworkNode.FACTORY)
+        self.retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Russia",
+            city="Moscow",
+            house_number="2",
+            supplier=self.factory,
+        )
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_retrieve_not_modified_without_serialization(self):
+        """Совпавший ETag даёт 304 одним запросом времени изменения"""
+        url = f"/network-nodes/{self.retail.pk}/"
+        etag = self._etag(url)
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # из кеша ответов 304 отдаётся без запросов
+        self._etag(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_products_and_supplier_name(self):
+        """Продукты и название поставщика входят в представление звена"""
+        url = f"/network-nodes/{self.retail.pk}/"
+        etag = self._etag(url)
+        Product.objects.create(
+            name="Phone", model="P1", release_date="2024-01-01", network_node=self.retail
+        )
+        with_product = self._etag(url)
+        self.assertNotEqual(etag, with_product)
+
+        self.factory.name = "Factory New"
+        self.factory.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=with_product)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["supplier_name"], "Factory New")
+
+    def test_list_etag_changes_on_delete(self):
+        """ETag списка меняется при удалении звена; Last-Modified у списка нет"""
+        etag = self._etag("/network-nodes/")
+        response = self.client.get("/network-nodes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("Last-Modified", self.client.get("/network-nodes/"))
+
+        self.assertNotEqual(etag, self._etag("/network-nodes/?country=rus"))
+        self.retail.delete()
+        response = self.client.get("/network-nodes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # клиент, хранящий только дату, получает полный ответ
+        response = self.client.get(
+            "/network-nodes/", HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_from_page_without_count(self):
+        """ETag списка строится по странице, без агрегата по всей выборке"""
+        etag = self._etag("/network-nodes/")
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/network-nodes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 2)
+        for query in context.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"].upper())
+            self.assertNotIn("MAX(", query["sql"].upper())
+
+        self.factory.street = "Lenina"
+        self.factory.save()
+        self.assertNotEqual(etag, self._etag("/network-nodes/"))
+
+
+class NetworkNodeReaderTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkNode.objects.create(
+            name="Factory",
+            node_type=NetworkNode.FACTORY,
+            email="factory@example.com",
+            phone="+79161234567",
+            country="Russia",
+            city="Moscow",
+            street="Tverskaya",
+            house_number="1",
+        )
+        self.retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Russia",
+            city="Moscow",
+            house_number="2",
+            supplier=self.factory,
+            debt_to_supplier=Decimal("1234.5"),
+        )
+        NetworkNode.objects.create(
+            name="Shop",
+            node_type=NetworkNode.INDIVIDUAL,
+            email="shop@example.com",
+            country="Russia",
+            city="Tver",
+            house_number="3",
+            supplier=self.retail,
+            debt_to_supplier=Decimal("0.01"),
+        )
+        for number in range(3):
+            Product.objects.create(
+                name=f"Phone {number}",
+                model="P",
+                release_date=f"2024-01-0{number + 1}",
+                network_node=self.retail,
+            )
+        Product.objects.create(
+            name="TV", model="T", release_date="2023-05-05", network_node=self.factory
+        )
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_parity_with_serializers(self):
+        """Чтение через values() даёт тот же JSON, что и сериализаторы"""
+        queryset = (
+            NetworkNode.objects.select_related("supplier")
+            .prefetch_related("products")
+            .order_by("id")
+        )
+        for serializer_class in (NetworkNodeSerializer, NetworkNodeExportSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                reader = NetworkNodeReader(serializer_class)
+                expected = serializer_class(list(queryset), many=True).data
+                self.assertEqual(
+                    self._render(reader.to_representation(reader.project(queryset))),
+                    self._render(expected),
+                )
+
+    def test_api_responses_match_serializer(self):
+        """Список, отдельное звено и поддерево отдаются в формате сериализатора"""
+        nodes = list(
+            NetworkNode.objects.select_related("supplier")
+            .prefetch_related("products")
+            .order_by("-created_at", "-id")
+        )
+        expected = NetworkNodeSerializer(nodes, many=True).data
+
+        response = self.client.get("/network-nodes/")
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),
+            JSONRenderer().render(expected),
+        )
+
+        # время изменения звена обновилось при добавлении продуктов
+        self.retail.refresh_from_db()
+        response = self.client.get(f"/network-nodes/{self.retail.pk}/")
+        self.assertEqual(
+            JSONRenderer().render(response.data),
+            JSONRenderer().render(NetworkNodeSerializer(self.retail).data),
+        )
+        self.assertEqual(len(response.data["products"]), 3)
+        self.assertEqual(response.data["debt_to_supplier"], "1234.50")
+
+        response = self.client.get(f"/network-nodes/{self.factory.pk}/subtree/")
+        self.assertEqual([row["name"] for row in response.data], ["Retail", "Shop"])
+        self.assertEqual(self.client.get("/network-nodes/999999/").status_code, 404)
+
+
+class CamelCaseTest(TestCase):
+    DATA = {
+        "debt_to_supplier": Decimal("10.50"),
+        "node_type_display": "Завод",
+        "address_2_line": None,
+        "key_2": [1, 2.5, True, "snake_value"],
+        "products": [{"release_date": "2024-01-01", "network_node": 1}],
+        "nested_tuple": ({"created_at": "x"},),
+        10: "int_key",
+        "ignored_field": {"inner_key": 1},
+        "ignored_key": 1,
+    }
+
+    def test_camelize_matches_library(self):
+        """Перевод ключей с кешем совпадает с djangorestframework_camel_case"""
+        data = dict(self.DATA, lazy_value=gettext_lazy("Завод"))
+        for options in (
+            {},
+            {"ignore_fields": ("ignored_field",), "ignore_keys": ("ignored_key",)},
+        ):
+            with self.subTest(options=options):
+                self.assertEqual(
+                    json.dumps(camelize(data, **options), default=str),
+                    json.dumps(util.camelize(data, **options), default=str),
+                )
+
+    def test_underscoreize_matches_library(self):
+        """Обратный перевод с кешем совпадает с библиотекой, в том числе для форм"""
+        payload = json.loads(json.dumps(camelize(self.DATA), default=str))
+        payload["HTTPResponse"] = "x"
+        payload["address2Line"] = "y"
+        for options in (
+            {},
+            {"no_underscore_before_number": True},
+            {"ignore_fields": ("ignoredField",), "ignore_keys": ("ignoredKey",)},
+        ):
+            with self.subTest(options=options):
+                self.assertEqual(
+                    underscoreize(payload, **options), util.underscoreize(payload, **options)
+                )
+        query = QueryDict("nodeType=factory&nodeType=retail&pageSize=2")
+        self.assertEqual(underscoreize(query), util.underscoreize(query))
+
+    def test_api_uses_cached_renderer_and_parser(self):
+        """Ответы и тела запросов API переводятся рендерером и парсером с кешем"""
+        self.assertIn(CamelCaseJSONRenderer, api_settings.DEFAULT_RENDERER_CLASSES)
+        self.assertIn(CamelCaseJSONParser, api_settings.DEFAULT_PARSER_CLASSES)
+
+
+class RendererNegotiationTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        factory = NetworkNode.objects.create(
+            name="Завод",
+            node_type=NetworkNode.FACTORY,
+            email="factory@example.com",
+            phone="+79161234567",
+            country="Russia",
+            city="Moscow",
+            house_number="1",
+        )
+        self.retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Russia",
+            city="Moscow",
+            house_number="2",
+            supplier=factory,
+            debt_to_supplier=Decimal("99.90"),
+        )
+        Product.objects.create(
+            name="TV", model="T", release_date="2023-05-05", network_node=self.retail
+        )
+
+    def test_camel_case_json_is_default(self):
+        """Без Accept и с Accept: application/json отвечает рендерер по умолчанию"""
+        for accept in ({}, {"HTTP_ACCEPT": "application/json"}, {"HTTP_ACCEPT": "*/*"}):
+            response = self.client.get("/network-nodes/", **accept)
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertIn(b'"debtToSupplier":"99.90"', response.content)
+
+    def test_msgpack_not_acceptable_without_library(self):
+        """Без msgpack MessagePack не предлагается"""
+        if renderers.msgpack is not None:
+            self.skipTest("msgpack установлен")
+        response = self.client.get(
+            "/network-nodes/", HTTP_ACCEPT="application/x-msgpack"
+        )
+        self.assertEqual(response.status_code, 406)
+
+    def test_msgpack_renderer(self):
+        """MessagePack содержит те же ключи и значения, что и JSON"""
+        if renderers.msgpack is None:
+            self.skipTest("msgpack не установлен")
+        url = f"/network-nodes/{self.retail.pk}/"
+        expected = json.loads(self.client.get(url).content)
+        response = self.client.get(url, HTTP_ACCEPT="application/x-msgpack")
+        self.assertEqual(response["Content-Type"], "application/x-msgpack")
+        self.assertEqual(renderers.msgpack.unpackb(response.content), expected)
+
+    def test_orjson_renderer_matches_default(self):
+        """orjson выбирается по Accept и отдаёт те же байты"""
+        if renderers.orjson is None:
+            self.skipTest("orjson не установлен")
+        url = f"/network-nodes/{self.retail.pk}/"
+        expected = self.client.get(url).content
+        response = self.client.get(url, HTTP_ACCEPT="application/json; engine=orjson")
+        self.assertEqual(response["Content-Type"], "application/json; engine=orjson")
+        self.assertEqual(response.content, expected)
+
+    def test_formats_have_separate_cache_entries_and_etags(self):
+        """Ответ из кеша не отдаёт ETag, посчитанный для другого формата"""
+        if renderers.orjson is None:
+            self.skipTest("orjson не установлен")
+        url = f"/network-nodes/{self.retail.pk}/"
+        default = self.client.get(url, HTTP_ACCEPT="application/json")
+        fast = self.client.get(url, HTTP_ACCEPT="application/json; engine=orjson")
+        self.assertEqual(fast["X-Cache"], "MISS")
+        self.assertNotEqual(default["ETag"], fast["ETag"])
+        cached = self.client.get(url, HTTP_ACCEPT="application/json; engine=orjson")
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached["ETag"], fast["ETag"])
+
+    def test_orjson_encodes_python_values_like_drf(self):
+        """Decimal, даты, время и телефоны кодируются так же, как JSONEncoder DRF"""
+        if renderers.orjson is None:
+            self.skipTest("orjson не установлен")
+        data = {
+            "debt_to_supplier": Decimal("10.25"),
+            "created_at": datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc
+            ),
+            "release_date": datetime.date(2024, 1, 2),
+            "phone": PhoneNumber.from_string("+79161234567"),
+            "node_type_display": gettext_lazy("Завод"),
+            "nodes_per_level": {1: 2},
+        }
+        rendered = renderers.CamelCaseORJSONRenderer().render(data)
+        json_data = dict(data, phone=str(data["phone"]))
+        self.assertEqual(rendered, CamelCaseJSONRenderer().render(json_data))
+        self.assertIn(b'"phone":"+79161234567"', rendered)
+
+    def test_orjson_parser(self):
+        """Тела application/json разбираются orjson, ключи переводятся в snake_case"""
+        if renderers.orjson is None:
+            self.skipTest("orjson не установлен")
+        parser = renderers.CamelCaseORJSONParser()
+        data = parser.parse(StringIO('{"nodeType": "retail", "houseNumber": "1"}'))
+        self.assertEqual(data, {"node_type": "retail", "house_number": "1"})
+
+        response = self.client.post(
+            "/network-nodes/create/",
+            b'{"name": "broken"',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsetTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        factory = create_node("Factory", NetworkNode.FACTORY)
+        self.retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="Russia",
+            city="Moscow",
+            house_number="2",
+            supplier=factory,
+        )
+        Product.objects.create(
+            name="TV", model="T", release_date="2023-05-05", network_node=self.retail
+        )
+
+    def test_fields_select_only_requested_columns(self):
+        """?fields= отдаёт только указанные поля одним запросом без JOIN и продуктов"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/network-nodes/", {"fields": "id,name,nodeType"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row for row in response.data["results"]],
+            [
+                {"id": self.retail.pk, "name": "Retail", "node_type": "retail"},
+                {"id": self.retail.supplier_id, "name": "Factory", "node_type": "factory"},
+            ],
+        )
+        # только сама страница: ETag строится по её строкам
+        self.assertEqual(len(context.captured_queries), 1)
+        page_query = context.captured_queries[0]["sql"]
+        self.assertNotIn("JOIN", page_query)
+        self.assertNotIn('"email"', page_query)
+
+        # позиция курсора берётся из created_at, даже если поля нет в ответе
+        response = self.client.get("/network-nodes/", {"fields": "id", "page_size": 1})
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"], [{"id": self.retail.supplier_id}])
+
+    def test_expand_relations(self):
+        """Связи включаются через ?expand=, без параметров ответ прежний"""
+        url = f"/network-nodes/{self.retail.pk}/"
+        full = self.client.get(url).data
+        self.assertIn("products", full)
+        self.assertIn("supplier_name", full)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"expand": "supplier"})
+        self.assertEqual(response.data["supplier_name"], "Factory")
+        self.assertNotIn("products", response.data)
+        self.assertEqual(set(full) - set(response.data), {"products"})
+
+        response = self.client.get(url, {"fields": "id", "expand": "products"})
+        self.assertEqual(list(response.data), ["id", "products"])
+        self.assertEqual(response.data["products"], full["products"])
+
+    def test_unknown_fields_rejected(self):
+        """Неизвестные поля и связи — ошибка 400"""
+        response = self.client.get("/network-nodes/", {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.data)
+        response = self.client.get(
+            f"/network-nodes/{self.retail.pk}/", {"expand": "children"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("expand", response.data)
+
+
+class LocationFilterTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.moscow = NetworkNode.objects.create(
+            name="Moscow",
+            node_type=NetworkNode.FACTORY,
+            email="moscow@example.com",
+            country=" Россия ",
+            city="Москва",
+            house_number="1",
+        )
+        NetworkNode.objects.bulk_create(
+            [
+                NetworkNode(
+                    name="Almaty",
+                    node_type=NetworkNode.FACTORY,
+                    email="almaty@example.com",
+                    country="Kazakhstan",
+                    city="  Алматы",
+                    house_number="2",
+                ),
+                NetworkNode(
+                    name="Minsk",
+                    node_type=NetworkNode.FACTORY,
+                    email="minsk@example.com",
+                    country="Республика Беларусь",
+                    city="Минск",
+                    house_number="3",
+                ),
+                NetworkNode(
+                    name="Unknown",
+                    node_type=NetworkNode.FACTORY,
+                    email="unknown@example.com",
+                    country="Нарния",
+                    city="Кэр-Параваль",
+                    house_number="4",
+                ),
+            ]
+        )
+
+    def _names(self, params):
+        response = self.client.get("/network-nodes/", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["name"] for row in response.data["results"])
+
+    def test_location_keys_are_normalized(self):
+        """Код страны и ключ города заполняются при save() и bulk_create()"""
+        self.assertEqual(
+            dict(NetworkNode.objects.values_list("name", "country_code")),
+            {"Moscow": "RU", "Almaty": "KZ", "Minsk": "BY", "Unknown": ""},
+        )
+        self.assertEqual(
+            NetworkNode.objects.get(name="Almaty").city_key, "алматы"
+        )
+        self.moscow.city = "САНКТ-ПЕТЕРБУРГ"
+        self.moscow.save(update_fields=["city"])
+        self.moscow.refresh_from_db()
+        self.assertEqual(self.moscow.city_key, "санкт-петербург")
+
+    def test_exact_and_in_filters(self):
+        """Фильтры принимают коды и названия стран, города — без учёта регистра"""
+        self.assertEqual(self._names({"country_code": "ru"}), ["Moscow"])
+        self.assertEqual(self._names({"country_code": "Казахстан"}), ["Almaty"])
+        self.assertEqual(
+            self._names({"country_code__in": "RU,KZ,Belarus"}),
+            ["Almaty", "Minsk", "Moscow"],
+        )
+        self.assertEqual(self._names({"country_code": "Нарния"}), [])
+        self.assertEqual(self._names({"city_key": "москва"}), ["Moscow"])
+        self.assertEqual(
+            self._names({"city_key__in": "МИНСК, алматы"}), ["Almaty", "Minsk"]
+        )
+
+    def test_filters_use_index(self):
+        """Фильтр по списку кодов стран выполняется по индексу"""
+        if connection.vendor != "sqlite":
+            self.skipTest("план запроса проверяется в SQLite")
+        queryset = NetworkNode.objects.filter(country_code__in=["RU", "KZ", "BY"])
+        self.assertIn("networknode_country_city_idx", queryset.explain())
+        queryset = NetworkNode.objects.filter(city_key="москва")
+        self.assertIn("networknode_city_key_idx", queryset.explain())
+
+    def test_backfill_migration(self):
+        """Миграция заполняет колонки у существующих звеньев"""
+        migration = import_module(
+            "network_nodes.migrations.0007_networknode_location_keys"
+        )
+        NetworkNode.objects.update(country_code="", city_key="")
+        migration.backfill_location_keys(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(
+            sorted(NetworkNode.objects.values_list("country_code", "city_key")),
+            [("", "кэр-параваль"), ("BY", "минск"), ("KZ", "алматы"), ("RU", "москва")],
+        )
+
+
+class LocationFacetsTest(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkNode.objects.create(
+            name="Factory",
+            node_type=NetworkNode.FACTORY,
+            email="factory@example.com",
+            country="Россия",
+            city="Москва",
+            house_number="1",
+        )
+        self.retail = NetworkNode.objects.create(
+            name="Retail",
+            node_type=NetworkNode.RETAIL,
+            email="retail@example.com",
+            country="russia",
+            city=" москва ",
+            house_number="2",
+            supplier=self.factory,
+            debt_to_supplier=Decimal("100.50"),
+        )
+        NetworkNode.objects.create(
+            name="Individual",
+            node_type=NetworkNode.INDIVIDUAL,
+            email="individual@example.com",
+            country="RU",
+            city="Казань",
+            house_number="3",
+            supplier=self.retail,
+            debt_to_supplier=Decimal("20.00"),
+        )
+        NetworkNode.objects.create(
+            name="Almaty",
+            node_type=NetworkNode.FACTORY,
+            email="almaty@example.com",
+            country="Казахстан",
+            city="Алматы",
+            house_number="4",
+        )
+
+    def _facets(self):
+        response = self.client.get("/network-nodes/facets/")
+        self.assertEqual(response.status_code, 200)
+        return {country["country_code"]: country for country in response.data}
+
+    def test_facets_group_by_country_and_city(self):
+        """Написания страны и города объединяются по нормализованным ключам"""
+        facets = self._facets()
+        self.assertEqual(list(facets), ["RU", "KZ"])
+        russia = facets["RU"]
+        self.assertEqual(russia["nodes"], 3)
+        self.assertEqual(russia["debt"], "120.50")
+        self.assertEqual(
+            russia["by_node_type"],
+            {
+                "factory": {"nodes": 1, "debt": "0.00"},
+                "retail": {"nodes": 1, "debt": "100.50"},
+                "individual": {"nodes": 1, "debt": "20.00"},
+            },
+        )
+        self.assertEqual(russia["by_level"]["2"], {"nodes": 1, "debt": "20.00"})
+        self.assertEqual(
+            [(city["city_key"], city["nodes"]) for city in russia["cities"]],
+            [("москва", 2), ("казань", 1)],
+        )
+
+    def test_facets_are_cached(self):
+        self._facets()
+        with self.assertNumQueries(0):
+            get_location_facets()
+
+    def test_save_refreshes_only_affected_cities(self):
+        """Изменение звена пересчитывает старый и новый город без полного пересчёта"""
+        get_location_facets()
+        self.retail.city = "Казань"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.retail.save()
+        facets = self._facets()
+        self.assertEqual(
+            [(city["city_key"], city["nodes"]) for city in facets["RU"]["cities"]],
+            [("казань", 2), ("москва", 1)],
+        )
+        self.assertEqual(facets["KZ"]["nodes"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NetworkNode.objects.create(
+                name="Astana",
+                node_type=NetworkNode.FACTORY,
+                email="astana@example.com",
+                country="KZ",
+                city="Астана",
+                house_number="5",
+            )
+        self.assertEqual(self._facets()["KZ"]["nodes"], 2)
+
+    def test_admin_city_filter(self):
+        """Варианты фильтра по городу: из кеша агрегатов или без пересчёта фасетов"""
+        admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password123", is_active=True
+        )
+        self.client.force_login(admin_user)
+        url = "/admin/network_nodes/networknode/"
+        kazan = "?city_key=%D0%BA%D0%B0%D0%B7%D0%B0%D0%BD%D1%8C"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, kazan)
+        # без кеша агрегатов — пары (ключ, город), без GROUP BY по четырём колонкам
+        self.assertFalse(
+            any("GROUP BY" in query["sql"].upper() for query in queries.captured_queries)
+        )
+        self.assertIsNone(get_cached_facets())
+
+        get_location_facets()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, kazan)
+        self.assertFalse(
+            any("DISTINCT" in query["sql"].upper() for query in queries.captured_queries)
+        )
+        response = self.client.get(url, {"city_key": "москва"})
+        self.assertEqual(response.context["cl"].result_count, 2)
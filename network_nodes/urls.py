@@ -2,11 +2,18 @@ from django.urls import path
 
 from network_nodes.apps import NetworkNodesConfig
 from network_nodes.views import (
+    LocationFacetsAPIView,
+    NetworkNodeBatchCreateAPIView,
     NetworkNodeCreateAPIView,
     NetworkNodeDestroyAPIView,
+    NetworkNodeExportAPIView,
     NetworkNodeListAPIView,
     NetworkNodeRetrieveAPIView,
+    NetworkNodeSubtreeAPIView,
     NetworkNodeUpdateAPIView,
+    ProductBulkUpsertAPIView,
+    ResponseCacheStatsAPIView,
+    SubtreeRollupAPIView,
 )
 
 app_name = NetworkNodesConfig.name
@@ -14,9 +21,32 @@ app_name = NetworkNodesConfig.name
 urlpatterns = [
     path("", NetworkNodeListAPIView.as_view(), name="network-nodes-list"),
     path("create/", NetworkNodeCreateAPIView.as_view(), name="network-nodes-create"),
+    path(
+        "batch-create/",
+        NetworkNodeBatchCreateAPIView.as_view(),
+        name="network-nodes-batch-create",
+    ),
+    path(
+        "products/bulk-upsert/",
+        ProductBulkUpsertAPIView.as_view(),
+        name="products-bulk-upsert",
+    ),
+    path("export/", NetworkNodeExportAPIView.as_view(), name="network-nodes-export"),
+    path("rollup/", SubtreeRollupAPIView.as_view(), name="network-nodes-rollup"),
+    path("facets/", LocationFacetsAPIView.as_view(), name="network-nodes-facets"),
+    path(
+        "cache-stats/",
+        ResponseCacheStatsAPIView.as_view(),
+        name="network-nodes-cache-stats",
+    ),
     path(
         "<int:pk>/", NetworkNodeRetrieveAPIView.as_view(), name="network-nodes-retrieve"
     ),
+    path(
+        "<int:pk>/subtree/",
+        NetworkNodeSubtreeAPIView.as_view(),
+        name="network-nodes-subtree",
+    ),
     path(
         "update/<int:pk>/",
         NetworkNodeUpdateAPIView.as_view(),
@@ -1,13 +1,44 @@
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics
+from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from network_nodes.cache import ResponseCacheMixin, get_response_cache_stats
+from network_nodes.conditional import (
+    ListConditionalGetMixin,
+    RetrieveConditionalGetMixin,
+)
+from network_nodes.exports import stream_csv, stream_ndjson
 from network_nodes.filters import NetworkNodeFilter
 from network_nodes.models import NetworkNode
-from network_nodes.paginations import NetworkNodePaginator
-from network_nodes.serializers import NetworkNodeSerializer
+from network_nodes.paginations import NetworkNodeCursorPaginator, NetworkNodePaginator
+from network_nodes.parsers import CamelCaseNDJSONParser
+from network_nodes.readers import FastReadMixin
+from network_nodes.serializers import (
+    CountryFacetSerializer,
+    NetworkNodeExportSerializer,
+    NetworkNodeSerializer,
+    SubtreeRollupSerializer,
+)
+from network_nodes.services import (
+    batch_create_nodes,
+    build_location_facets,
+    get_location_facets,
+    get_subtree_rollup,
+    upsert_products,
+)
 from users.permissions import IsActiveEmployee, IsAdmin
 
+# форматы потоковой выгрузки: функция-генератор, content type, расширение файла
+EXPORT_FORMATS = {
+    "ndjson": (stream_ndjson, "application/x-ndjson", "ndjson"),
+    "csv": (stream_csv, "text/csv", "csv"),
+}
+
 
 class NetworkNodeCreateAPIView(generics.CreateAPIView):
     """
@@ -19,36 +50,240 @@ class NetworkNodeCreateAPIView(generics.CreateAPIView):
     permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
 
 
-class NetworkNodeListAPIView(generics.ListAPIView):
+class NetworkNodeBatchCreateAPIView(APIView):
+    """
+    Пакетное создание звеньев сети: JSON-массив или NDJSON (application/x-ndjson).
+
+    Звенья могут ссылаться друг на друга через временные id (tempId и
+    supplierTempId). Все звенья создаются в одной транзакции; при ошибках
+    ничего не записывается и возвращаются ошибки по индексам элементов.
+    """
+
+    parser_classes = (*api_settings.DEFAULT_PARSER_CLASSES, CamelCaseNDJSONParser)
+    permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
+    max_batch_size = 10000
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"error": "Ожидается массив звеньев сети."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.max_batch_size:
+            return Response(
+                {"error": f"Не более {self.max_batch_size} звеньев за один запрос."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        nodes, errors = batch_create_nodes(items)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        results = [
+            {"index": index, "temp_id": item.get("temp_id"), "id": node.pk}
+            for index, (item, node) in enumerate(zip(items, nodes))
+        ]
+        return Response(
+            {"created": len(nodes), "results": results}, status=status.HTTP_201_CREATED
+        )
+
+
+class ProductBulkUpsertAPIView(APIView):
+    """
+    Пакетная вставка или обновление продуктов: JSON-массив или NDJSON.
+
+    Ключ продукта — (networkNode, name, model); у существующих продуктов
+    обновляется дата выхода. Невалидные строки отклоняются, остальные
+    записываются. В ответе — количество вставленных, обновлённых и
+    отклонённых строк и ошибки по индексам.
+    """
+
+    parser_classes = (*api_settings.DEFAULT_PARSER_CLASSES, CamelCaseNDJSONParser)
+    permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
+    max_batch_size = 50000
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"error": "Ожидается массив продуктов."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.max_batch_size:
+            return Response(
+                {"error": f"Не более {self.max_batch_size} продуктов за один запрос."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(upsert_products(items))
+
+
+class NetworkNodeListAPIView(
+    ResponseCacheMixin, ListConditionalGetMixin, FastReadMixin, generics.ListAPIView
+):
     """
-    Список звеньев сети с фильтрацией по стране.
+    Список звеньев сети с фильтрацией по стране и поиском (?search=).
+
+    По умолчанию используется курсорная пагинация (?cursor=...).
+    Постраничный режим с общим количеством включается параметром ?page=
+    и подходит для небольших выборок. Результаты поиска отсортированы
+    по релевантности, поэтому для них всегда используется постраничный режим.
+    Ответы кешируются до изменения звеньев или продуктов, поддерживается
+    условный GET по ETag и Last-Modified. Строки читаются через values()
+    без создания объектов модели (см. network_nodes.readers).
     """
 
     serializer_class = NetworkNodeSerializer
-    queryset = NetworkNode.objects.all().order_by("-created_at")
-    pagination_class = NetworkNodePaginator
+    queryset = (
+        NetworkNode.objects.select_related("supplier")
+        .prefetch_related("products")
+        .order_by("-created_at", "-id")
+    )
+    pagination_class = NetworkNodeCursorPaginator
     filter_backends = [DjangoFilterBackend]
     filterset_class = NetworkNodeFilter
     permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
 
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if NetworkNodePaginator.page_query_param in params or params.get("search"):
+                self._paginator = NetworkNodePaginator()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class NetworkNodeExportAPIView(generics.GenericAPIView):
+    """
+    Потоковая выгрузка всех звеньев сети в NDJSON или CSV (только для сотрудников).
+
+    Параметры: export_format=ndjson|csv, products=true для вложения продуктов,
+    а также фильтры списка звеньев. Строки читаются из БД пачками через
+    QuerySet.iterator(), поэтому потребление памяти не зависит от размера таблицы.
+    """
+
+    queryset = NetworkNode.objects.select_related("supplier").order_by("id")
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = NetworkNodeFilter
+    permission_classes = (IsAuthenticated, IsActiveEmployee)
+
+    def perform_content_negotiation(self, request, force=False):
+        # выгрузка сама задаёт content type, поэтому Accept: text/csv не ошибка
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Поддерживаемые форматы: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        stream, content_type, extension = EXPORT_FORMATS[export_format]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params.get("products") in ("1", "true", "True"):
+            queryset = queryset.prefetch_related("products")
+            serializer = NetworkNodeSerializer()
+        else:
+            serializer = NetworkNodeExportSerializer()
+
+        response = StreamingHttpResponse(
+            stream(queryset, serializer), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="network_nodes.{extension}"'
+        )
+        return response
+
 
-class NetworkNodeRetrieveAPIView(generics.RetrieveAPIView):
+class ResponseCacheStatsAPIView(APIView):
     """
-    Получение одного звена сети.
+    Счётчики попаданий и промахов кеша ответов API звеньев сети.
+    """
+
+    permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
+
+    def get(self, request):
+        return Response(get_response_cache_stats())
+
+
+class NetworkNodeRetrieveAPIView(
+    ResponseCacheMixin,
+    RetrieveConditionalGetMixin,
+    FastReadMixin,
+    generics.RetrieveAPIView,
+):
+    """
+    Получение одного звена сети (ответ кешируется до изменения звеньев или продуктов).
+    Поддерживает условный GET по ETag и Last-Modified.
     """
 
     serializer_class = NetworkNodeSerializer
-    queryset = NetworkNode.objects.all()
+    queryset = NetworkNode.objects.select_related("supplier").prefetch_related(
+        "products"
+    )
     permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
 
 
+class NetworkNodeSubtreeAPIView(FastReadMixin, generics.ListAPIView):
+    """
+    Все потомки звена сети (поддерево) одним запросом по материализованному пути.
+    """
+
+    serializer_class = NetworkNodeSerializer
+    pagination_class = None
+    permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
+
+    def get_queryset(self):
+        node = get_object_or_404(
+            NetworkNode.objects.only("id", "path"), pk=self.kwargs["pk"]
+        )
+        return (
+            NetworkNode.objects.descendants_of(node)
+            .select_related("supplier")
+            .prefetch_related("products")
+            .order_by("path", "id")
+        )
+
+
+class SubtreeRollupAPIView(APIView):
+    """
+    Суммарная задолженность и количество звеньев по уровням в поддереве
+    каждого завода и розничной сети. Результат кешируется и сбрасывается
+    при изменении долга, поставщика или удалении звена.
+    """
+
+    permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
+
+    def get(self, request):
+        serializer = SubtreeRollupSerializer(get_subtree_rollup(), many=True)
+        return Response(serializer.data)
+
+
+class LocationFacetsAPIView(APIView):
+    """
+    Количество звеньев и задолженность по странам и городам с разбивкой
+    по типам звеньев и уровням. Группировка выполняется в БД, результат
+    кешируется; изменение звена пересчитывает только его страну и город.
+    """
+
+    permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
+
+    def get(self, request):
+        facets = build_location_facets(get_location_facets())
+        return Response(CountryFacetSerializer(facets, many=True).data)
+
+
 class NetworkNodeUpdateAPIView(generics.UpdateAPIView):
     """
     Обновление звена сети (запрещено менять задолженность через API).
     """
 
     serializer_class = NetworkNodeSerializer
-    queryset = NetworkNode.objects.all()
+    queryset = NetworkNode.objects.select_related("supplier").prefetch_related(
+        "products"
+    )
     permission_classes = (IsAuthenticated, IsActiveEmployee | IsAdmin)
 
 
@@ -7,7 +7,7 @@
 
 from django.contrib import admin
 
-from users.models import User
+from users.models import OutgoingEmail, User
 
 
 @admin.register(User)
@@ -25,3 +25,18 @@ class UserAdmin(admin.ModelAdmin):
         "is_superuser",
     )
     ordering = ("id",)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "subject",
+        "recipients",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+    ordering = ("-id",)
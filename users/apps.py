@@ -5,3 +5,7 @@ class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
     verbose_name = "пользователи"
+
+    def ready(self):
+        # регистрация обработчиков сигналов
+        from users import signals  # noqa: F401
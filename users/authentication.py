@@ -0,0 +1,120 @@
+"""
+Аутентификация по утверждениям (claims) JWT без запроса пользователя к БД.
+
+Токены, выданные users/login/ и users/token/refresh/, содержат is_active,
+is_staff, role и членство в группе admins. ClaimsJWTAuthentication строит
+request.user из этих утверждений, поэтому проверки разрешений не обращаются
+к БД. Изменения пользователя вступают в силу с новым access-токеном, то есть
+не позже чем через ACCESS_TOKEN_LIFETIME. Токены без утверждений (выданные
+до включения режима) проверяются как раньше, загрузкой пользователя.
+"""
+
+import copy
+import time
+
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+from users.permissions import is_admin
+
+USER_CLAIMS = ("is_active", "is_staff", "role", "is_admin")
+
+# полные объекты пользователей в памяти процесса для представлений, которым
+# нужны поля вне утверждений; изменения в других процессах видны через TTL
+USER_CACHE_TTL = 30
+USER_CACHE_SIZE = 1024
+_user_cache: dict = {}
+
+
+def get_cached_user(user_id) -> User:
+    now = time.monotonic()
+    entry = _user_cache.get(user_id)
+    if entry is None or entry[0] <= now:
+        if len(_user_cache) >= USER_CACHE_SIZE:
+            _user_cache.clear()
+        entry = (now + USER_CACHE_TTL, User.objects.get(pk=user_id))
+        _user_cache[user_id] = entry
+    # копия: объект из кеша разделяется потоками и запросами
+    return copy.copy(entry[1])
+
+
+def forget_cached_user(user_id) -> None:
+    _user_cache.pop(user_id, None)
+
+
+def add_user_claims(token, user) -> None:
+    token["is_active"] = user.is_active
+    token["is_staff"] = user.is_staff
+    token["role"] = user.role
+    token["is_admin"] = is_admin(user)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh-токен, access-токены которого получают актуальные утверждения
+    пользователя при каждом обновлении, а не копию утверждений входа
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token._user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = getattr(self, "_user", None)
+        if user is None:
+            user = User.objects.get(pk=self[api_settings.USER_ID_CLAIM])
+        add_user_claims(access, user)
+        return access
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь запроса из утверждений токена. Поля, которых нет
+    в утверждениях, берутся из полного объекта User (кеш процесса)
+    """
+
+    def __init__(self, token):
+        super().__init__(token)
+        # is_admin() не обращается к БД
+        self._is_admin = token["is_admin"]
+
+    @cached_property
+    def is_active(self) -> bool:
+        return self.token["is_active"]
+
+    @cached_property
+    def role(self) -> str:
+        return self.token["role"]
+
+    @cached_property
+    def user(self) -> User:
+        return get_cached_user(self.id)
+
+    @property
+    def groups(self):
+        return self.user.groups
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        claims = (api_settings.USER_ID_CLAIM, *USER_CLAIMS)
+        if not all(claim in validated_token for claim in claims):
+            # токен выдан до включения режима: загружаем пользователя из БД
+            return super().get_user(validated_token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not validated_token["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return ClaimsUser(validated_token)
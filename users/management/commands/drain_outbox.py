@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from users.outbox import BATCH_SIZE, drain_outbox, get_outbox_stats
+
+
+class Command(BaseCommand):
+    help = "Отправляет накопившиеся письма из очереди пачками через одно соединение"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Количество писем в одной пачке",
+        )
+
+    def handle(self, *args, **options):
+        stats = drain_outbox(batch_size=options["batch_size"])
+        self.stdout.write(
+            "Отправлено: {sent}, отложено: {retried}, не отправлено: {failed}, "
+            "пачек: {batches}, соединений: {connections}".format(**stats)
+        )
+        queue = get_outbox_stats()
+        self.stdout.write(
+            "В очереди: {pending}, не отправлено всего: {failed_total}".format(**queue)
+        )
@@ -3,6 +3,7 @@ import secrets
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
 NULLABLE = {"blank": True, "null": True}
@@ -100,3 +101,53 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди отправки. Представления только добавляют письма,
+    отправляет их users.outbox.drain_outbox пачками через одно соединение.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Ожидает отправки"),
+        (STATUS_SENT, "Отправлено"),
+        (STATUS_FAILED, "Не отправлено"),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="тема")
+    message = models.TextField(verbose_name="текст")
+    from_email = models.CharField(
+        max_length=255, blank=True, verbose_name="отправитель"
+    )
+    recipients = models.JSONField(verbose_name="получатели")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="статус",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="попытки")
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name="следующая попытка"
+    )
+    last_error = models.TextField(blank=True, verbose_name="последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="создано")
+    sent_at = models.DateTimeField(**NULLABLE, verbose_name="отправлено")
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+    class Meta:
+        verbose_name = "Исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+        indexes = [
+            # выборка писем, которые пора отправить
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outgoingemail_due_idx"
+            ),
+        ]
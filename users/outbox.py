@@ -0,0 +1,190 @@
+"""
+Очередь исходящих писем.
+
+Представления не обращаются к почтовому серверу: enqueue_email сохраняет
+письмо в таблицу OutgoingEmail и планирует проход drain_outbox. Проход
+откладывается на DRAIN_DEBOUNCE секунд и не планируется повторно, пока
+не начался, поэтому письма всплеска регистраций уходят одним проходом
+через одно SMTP-соединение вместо TLS-рукопожатия на каждое письмо.
+Ошибки отправки повторяются с экспоненциальной паузой, после MAX_ATTEMPTS
+попыток письмо помечается неотправленным.
+"""
+
+import logging
+from datetime import timedelta
+from smtplib import SMTPException, SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+from users.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# пауза перед повтором: 1, 2, 4, 8 минут, но не больше часа
+RETRY_BACKOFF = 60
+RETRY_BACKOFF_MAX = 60 * 60
+
+DRAIN_DEBOUNCE = 5
+# флаг запланированного прохода; истекает, если задача потерялась
+DRAIN_LOCK_KEY = "users:outbox:drain-scheduled"
+DRAIN_LOCK_TIMEOUT = 60
+
+# накопительные счётчики проходов
+STATS_CACHE_KEY = "users:outbox:{}"
+STATS_COUNTERS = ("sent", "retried", "failed", "batches", "connections")
+
+SEND_ERRORS = (SMTPException, OSError)
+# обрыв соединения прекращает проход: остальные письма не тратят попыток
+CONNECTION_ERRORS = (SMTPServerDisconnected, OSError)
+
+
+def enqueue_email(subject: str, message: str, recipient_list: list[str]):
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=settings.DEFAULT_FROM_EMAIL or "",
+        recipients=list(recipient_list),
+    )
+    # проход не должен начаться раньше, чем письмо станет видно воркеру
+    transaction.on_commit(schedule_drain)
+    return email
+
+
+def schedule_drain() -> None:
+    """
+    Планирует проход очереди, если он ещё не запланирован. Недоступность
+    брокера не должна ломать запрос: письмо уже в очереди, его отправит
+    ближайший проход по расписанию beat
+    """
+    from users.tasks import drain_outbox_task
+
+    if not cache.add(DRAIN_LOCK_KEY, 1, DRAIN_LOCK_TIMEOUT):
+        return
+    try:
+        drain_outbox_task.apply_async(countdown=DRAIN_DEBOUNCE)
+    except (OperationalError, OSError):
+        # флаг остаётся до истечения: брокер не опрашивается на каждое письмо
+        logger.exception("Не удалось запланировать отправку очереди писем")
+
+
+def drain_outbox(batch_size: int = BATCH_SIZE, connection=None) -> dict:
+    """
+    Отправляет письма, которым пора уйти, пачками по batch_size через одно
+    соединение. Пачка блокируется SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    параллельные проходы не отправляют письмо дважды. Если сервер недоступен
+    или соединение оборвалось, проход прекращается, а неотправленные письма
+    ждут следующего прохода без траты попыток.
+    """
+    stats = dict.fromkeys(STATS_COUNTERS, 0)
+    connection = connection or get_connection()
+    opened = False
+    try:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    OutgoingEmail.objects.select_for_update(skip_locked=True)
+                    .filter(
+                        status=OutgoingEmail.STATUS_PENDING,
+                        next_attempt_at__lte=timezone.now(),
+                    )
+                    .order_by("next_attempt_at", "id")[:batch_size]
+                )
+                if not batch:
+                    break
+                if not opened:
+                    try:
+                        connection.open()
+                    except SEND_ERRORS:
+                        # письма остаются в очереди с прежним числом попыток
+                        logger.warning("Почтовый сервер недоступен", exc_info=True)
+                        break
+                    opened = True
+                    stats["connections"] += 1
+                connected = all(_send(connection, email, stats) for email in batch)
+                _save_batch(batch)
+                stats["batches"] += 1
+                if not connected:
+                    break
+    finally:
+        if opened:
+            connection.close()
+    _record_stats(stats)
+    return stats
+
+
+def _send(connection, email, stats) -> bool:
+    """
+    Отправляет письмо; False — соединение оборвалось. Попытка засчитывается
+    только этому письму: если обрыв вызывает само письмо, оно не должно
+    задерживать очередь бесконечно
+    """
+    message = EmailMessage(
+        subject=email.subject,
+        body=email.message,
+        from_email=email.from_email or None,
+        to=email.recipients,
+        connection=connection,
+    )
+    try:
+        connection.send_messages([message])
+    except SEND_ERRORS as exc:
+        _postpone(email, exc, stats)
+        return not isinstance(exc, CONNECTION_ERRORS)
+    email.attempts += 1
+    email.status = OutgoingEmail.STATUS_SENT
+    email.sent_at = timezone.now()
+    email.last_error = ""
+    stats["sent"] += 1
+    return True
+
+
+def _postpone(email, exc, stats) -> None:
+    email.attempts += 1
+    email.last_error = repr(exc)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutgoingEmail.STATUS_FAILED
+        stats["failed"] += 1
+        return
+    delay = min(RETRY_BACKOFF * 2 ** (email.attempts - 1), RETRY_BACKOFF_MAX)
+    email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    stats["retried"] += 1
+
+
+def _save_batch(batch) -> None:
+    OutgoingEmail.objects.bulk_update(
+        batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+    )
+
+
+def _record_stats(stats: dict) -> None:
+    for counter, value in stats.items():
+        if not value:
+            continue
+        key = STATS_CACHE_KEY.format(counter)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.add(key, value, None)
+
+
+def get_outbox_stats() -> dict:
+    """Счётчики проходов и состояние очереди"""
+    values = cache.get_many([STATS_CACHE_KEY.format(c) for c in STATS_COUNTERS])
+    stats = {
+        counter: values.get(STATS_CACHE_KEY.format(counter), 0)
+        for counter in STATS_COUNTERS
+    }
+    queue = OutgoingEmail.objects.exclude(status=OutgoingEmail.STATUS_SENT).aggregate(
+        pending=Count("id", filter=Q(status=OutgoingEmail.STATUS_PENDING)),
+        failed_total=Count("id", filter=Q(status=OutgoingEmail.STATUS_FAILED)),
+        oldest_pending=Min("created_at", filter=Q(status=OutgoingEmail.STATUS_PENDING)),
+    )
+    return {**stats, **queue}
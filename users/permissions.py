@@ -1,5 +1,35 @@
+from django.core.cache import cache
 from rest_framework import permissions
 
+ADMIN_GROUP = "admins"
+# членство в группе admins по id пользователя; сбрасывается сигналами
+# при изменении групп пользователя, поэтому срок хранения большой
+ADMIN_CACHE_KEY = "users:is_admin:{}"
+ADMIN_CACHE_TIMEOUT = 60 * 60
+
+
+def is_admin(user) -> bool:
+    """
+    Состоит ли пользователь в группе admins. Результат запоминается на объекте
+    пользователя (он живёт один запрос) и в общем кеше, так что проверка
+    разрешений обычно не обращается к БД
+    """
+    if not user.is_authenticated:
+        return False
+    if not hasattr(user, "_is_admin"):
+        key = ADMIN_CACHE_KEY.format(user.pk)
+        value = cache.get(key)
+        if value is None:
+            value = user.groups.filter(name=ADMIN_GROUP).exists()
+            cache.set(key, value, ADMIN_CACHE_TIMEOUT)
+        user._is_admin = value
+    return user._is_admin
+
+
+def invalidate_admin_status(user_ids) -> None:
+    cache.delete_many([ADMIN_CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
 # users/permissions.py
 class IsActiveEmployee(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -13,4 +43,4 @@ class IsAdmin(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="admins").exists()
+        return is_admin(request.user)
@@ -2,7 +2,12 @@ import secrets
 
 from django.core import signing
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 
+from users.authentication import ClaimsRefreshToken
 from users.models import User
 
 
@@ -169,3 +174,20 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         # Удаляем токен после успешного сброса пароля
         user.token = None
         user.save()
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Вход: access-токен содержит is_active, is_staff, role и is_admin,
+    по которым ClaimsJWTAuthentication аутентифицирует запросы без БД.
+    """
+
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление access-токена с актуальными утверждениями пользователя.
+    """
+
+    token_class = ClaimsRefreshToken
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.authentication import forget_cached_user
+from users.models import User
+from users.permissions import invalidate_admin_status
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_admin_on_groups_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Сбрасываем закешированное членство в admins при изменении групп
+    пользователя (user.groups) или состава группы (group.user_set)
+    """
+    if action == "pre_clear" and reverse:
+        # после очистки состав группы уже не узнать
+        invalidate_admin_status(instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        invalidate_admin_status(pk_set if reverse else [instance.pk])
+    elif action == "post_clear" and not reverse:
+        invalidate_admin_status([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_admin_on_group_change(sender, instance, **kwargs):
+    """Переименование или удаление группы меняет членство в admins её участников"""
+    if instance.pk:
+        invalidate_admin_status(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_admin_on_user_create(sender, instance, created, **kwargs):
+    # id удалённого пользователя может достаться новому
+    if created:
+        invalidate_admin_status([instance.pk])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_on_change(sender, instance, **kwargs):
+    """Сбрасываем объект пользователя из кеша процесса ClaimsUser"""
+    forget_cached_user(instance.pk)
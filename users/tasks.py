@@ -0,0 +1,14 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from users.outbox import DRAIN_LOCK_KEY, drain_outbox
+
+
+@shared_task
+def drain_outbox_task() -> dict:
+    """
+    Проход очереди исходящих писем. Флаг снимается в начале прохода, чтобы
+    письма, добавленные во время отправки, запланировали следующий
+    """
+    cache.delete(DRAIN_LOCK_KEY)
+    return drain_outbox()
@@ -1,16 +1,35 @@
 import json
+from io import StringIO
+from smtplib import SMTPServerDisconnected
+from unittest import mock
 
 from django.contrib.auth.models import Group
 from django.core import mail, signing
+from django.core.cache import cache
 from django.core.mail import EmailMessage
+from django.core.mail.backends import locmem
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from kombu.exceptions import OperationalError
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, APITestCase
-
-from users.models import User
-from users.permissions import IsAdmin
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import ClaimsJWTAuthentication
+from users.models import OutgoingEmail, User
+from users.outbox import (
+    DRAIN_LOCK_KEY,
+    MAX_ATTEMPTS,
+    drain_outbox,
+    enqueue_email,
+    get_outbox_stats,
+    schedule_drain,
+)
+from users.permissions import IsActiveEmployee, IsAdmin
 from users.serializers import PasswordResetConfirmSerializer
+from users.tasks import drain_outbox_task
 
 
 #  тестирование методов модели User
@@ -154,11 +173,12 @@ class PasswordResetAPIViewTest(APITestCase):
         """
         data = {"email": "test@example.com"}
 
-        response = self.client.post(
-            "/users/password-reset/",
-            data=json.dumps(data),
-            content_type="application/json",
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/users/password-reset/",
+                data=json.dumps(data),
+                content_type="application/json",
+            )
         # Проверяем статус ответа
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
@@ -355,6 +375,7 @@ class CreateUsersCommandTest(TestCase):
 
 class IsAdminTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.factory = APIRequestFactory()
         self.user = User.objects.create_user(
             email="user@example.com", password="password123"
@@ -382,6 +403,46 @@ class IsAdminTest(APITestCase):
         request.user = self.user
         self.assertFalse(self.permission.has_permission(request, None))
 
+    def _has_permission(self, user_id):
+        # новый объект пользователя, как при каждом запросе
+        request = self.factory.get("/some-endpoint/")
+        request.user = User.objects.get(pk=user_id)
+        return self.permission.has_permission(request, None)
+
+    def test_permission_check_is_cached(self):
+        """
+        Проверяет, что повторные проверки не обращаются к БД.
+        """
+        request = self.factory.get("/some-endpoint/")
+        request.user = self.admin_user
+        self.assertTrue(self.permission.has_permission(request, None))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.permission.has_permission(request, None))
+
+        # следующий запрос с новым объектом пользователя берёт результат из кеша
+        request.user = User.objects.get(pk=self.admin_user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.permission.has_permission(request, None))
+
+    def test_group_changes_invalidate_cache(self):
+        """
+        Проверяет, что изменение групп пользователя сбрасывает кеш.
+        """
+        self.assertTrue(self._has_permission(self.admin_user.pk))
+        self.admin_user.groups.remove(self.admin_group)
+        self.assertFalse(self._has_permission(self.admin_user.pk))
+
+        self.assertFalse(self._has_permission(self.user.pk))
+        self.admin_group.user_set.add(self.user)
+        self.assertTrue(self._has_permission(self.user.pk))
+        self.admin_group.user_set.clear()
+        self.assertFalse(self._has_permission(self.user.pk))
+
+        self.user.groups.add(self.admin_group)
+        self.assertTrue(self._has_permission(self.user.pk))
+        self.admin_group.name = "former-admins"
+        self.admin_group.save()
+        self.assertFalse(self._has_permission(self.user.pk))
 
 
 class PasswordResetConfirmSerializerTest(APITestCase):
@@ -500,3 +561,250 @@ class PasswordResetConfirmSerializerTest(APITestCase):
         self.assertEqual(
             serializer.errors["uid"][0], "Неверный идентификатор пользователя."
         )
+
+
+class ClaimsJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            email="staff@example.com",
+            password="password123",
+            is_active=True,
+            is_staff=True,
+        )
+        self.user.groups.add(Group.objects.create(name="admins"))
+
+    def _login(self):
+        response = self.client.post(
+            "/users/login/",
+            {"email": "staff@example.com", "password": "password123"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def _authenticate(self, access):
+        request = self.factory.get("/some-endpoint/")
+        request.META["HTTP_AUTHORIZATION"] = f"Bearer {access}"
+        user, _ = ClaimsJWTAuthentication().authenticate(request)
+        return user
+
+    def test_login_token_contains_claims(self):
+        """
+        Проверяет, что access-токен содержит утверждения пользователя.
+        """
+        token = AccessToken(self._login()["access"])
+        self.assertTrue(token["is_active"])
+        self.assertTrue(token["is_staff"])
+        self.assertEqual(token["role"], User.ROLE_USER)
+        self.assertTrue(token["is_admin"])
+
+    def test_authentication_without_queries(self):
+        """
+        Проверяет, что аутентификация и проверка разрешений не обращаются к БД.
+        """
+        access = self._login()["access"]
+        request = self.factory.get("/some-endpoint/")
+        with self.assertNumQueries(0):
+            request.user = self._authenticate(access)
+            self.assertEqual(request.user.pk, self.user.pk)
+            self.assertTrue(IsActiveEmployee().has_permission(request, None))
+            self.assertTrue(IsAdmin().has_permission(request, None))
+
+        # остальные поля — из полного объекта, загруженного один раз
+        with self.assertNumQueries(1):
+            self.assertEqual(request.user.email, "staff@example.com")
+            self.assertEqual(self._authenticate(access).email, "staff@example.com")
+
+    def test_refresh_updates_claims(self):
+        """
+        Проверяет, что обновлённый access-токен отражает изменения пользователя.
+        """
+        refresh = self._login()["refresh"]
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        response = self.client.post(
+            "/users/token/refresh/", {"refresh": refresh}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self._authenticate(response.data["access"]).is_staff)
+
+    def test_inactive_claim_is_rejected(self):
+        token = AccessToken(self._login()["access"])
+        token["is_active"] = False
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(str(token))
+
+    def test_token_without_claims_loads_user(self):
+        """
+        Проверяет, что токены без утверждений по-прежнему принимаются.
+        """
+        user = self._authenticate(str(AccessToken.for_user(self.user)))
+        self.assertIsInstance(user, User)
+
+
+class FailingEmailBackend(locmem.EmailBackend):
+    """Почтовый бэкенд, отклоняющий отправку и считающий открытия соединения"""
+
+    def __init__(self, failures=0, unavailable=False, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.unavailable = unavailable
+        self.opened = 0
+
+    def open(self):
+        self.opened += 1
+        if self.unavailable:
+            raise ConnectionRefusedError("Connection refused")
+        return False
+
+    def send_messages(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise SMTPServerDisconnected("Connection unexpectedly closed")
+        return super().send_messages(messages)
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_register_enqueues_email(self):
+        """
+        Проверяет, что письмо подтверждения проходит через очередь.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/users/register/",
+                {"email": "newuser@example.com", "password": "newpassword123"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_SENT)
+        self.assertEqual(email.recipients, ["newuser@example.com"])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("/users/email-confirm/", mail.outbox[0].body)
+
+    def test_burst_is_sent_over_one_connection(self):
+        """
+        Проверяет, что письма всплеска уходят одним проходом пачками
+        через одно соединение.
+        """
+        # проход уже запланирован: новые письма только ждут его
+        cache.set(DRAIN_LOCK_KEY, 1)
+        for number in range(5):
+            enqueue_email("Тема", "Текст", [f"user{number}@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+
+        connection = FailingEmailBackend()
+        stats = drain_outbox(batch_size=2, connection=connection)
+        self.assertEqual(connection.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(stats["sent"], 5)
+        self.assertEqual(stats["batches"], 3)
+        self.assertEqual(get_outbox_stats()["pending"], 0)
+
+    def test_failed_email_is_retried_with_backoff(self):
+        """
+        Проверяет повтор отправки после паузы и отказ после MAX_ATTEMPTS попыток.
+        """
+        cache.set(DRAIN_LOCK_KEY, 1)
+        email = enqueue_email("Тема", "Текст", ["user@example.com"])
+
+        stats = drain_outbox(connection=FailingEmailBackend(failures=1))
+        self.assertEqual(stats["retried"], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("SMTPServerDisconnected", email.last_error)
+        # до следующей попытки письмо не отправляется
+        self.assertEqual(drain_outbox()["sent"], 0)
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox()["sent"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+        email = enqueue_email("Тема", "Текст", ["other@example.com"])
+        for _ in range(MAX_ATTEMPTS):
+            OutgoingEmail.objects.filter(pk=email.pk).update(
+                next_attempt_at=timezone.now()
+            )
+            drain_outbox(connection=FailingEmailBackend(failures=1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+
+    def test_connection_loss_does_not_spend_attempts(self):
+        """
+        Проверяет, что обрыв соединения прекращает проход, а письма, до которых
+        он не дошёл, сохраняют число попыток.
+        """
+        cache.set(DRAIN_LOCK_KEY, 1)
+        for number in range(4):
+            enqueue_email("Тема", "Текст", [f"user{number}@example.com"])
+
+        with self.assertLogs("users.outbox", level="WARNING"):
+            stats = drain_outbox(connection=FailingEmailBackend(unavailable=True))
+        self.assertEqual(stats["connections"], 0)
+        self.assertEqual(stats["retried"], 0)
+        self.assertFalse(OutgoingEmail.objects.exclude(attempts=0).exists())
+
+        stats = drain_outbox(batch_size=2, connection=FailingEmailBackend(failures=1))
+        self.assertEqual(stats["retried"], 1)
+        self.assertEqual(stats["sent"], 0)
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(
+            sorted(OutgoingEmail.objects.values_list("attempts", flat=True)), [0, 0, 0, 1]
+        )
+        # следующий проход отправляет остальные
+        self.assertEqual(drain_outbox()["sent"], 3)
+
+    def test_drain_is_scheduled_after_commit(self):
+        """
+        Проверяет, что проход планируется только после фиксации транзакции.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue_email("Тема", "Текст", ["user@example.com"])
+        self.assertEqual(callbacks, [schedule_drain])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_broker_errors_do_not_fail_request(self):
+        """
+        Проверяет, что недоступный брокер не ломает регистрацию: письмо
+        остаётся в очереди до прохода по расписанию.
+        """
+        with mock.patch.object(
+            drain_outbox_task,
+            "apply_async",
+            side_effect=OperationalError("Connection refused"),
+        ), self.assertLogs("users.outbox", level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/users/register/",
+                    {"email": "newuser@example.com", "password": "newpassword123"},
+                    content_type="application/json",
+                )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(get_outbox_stats()["pending"], 1)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    )
+    def test_drain_without_shared_cache(self):
+        """
+        Проверяет, что очередь отправляется и без общего кеша.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_email("Тема", "Текст", ["user@example.com"])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(get_outbox_stats()["pending"], 0)
+
+    def test_drain_outbox_command(self):
+        cache.set(DRAIN_LOCK_KEY, 1)
+        enqueue_email("Тема", "Текст", ["user@example.com"])
+        out = StringIO()
+        call_command("drain_outbox", stdout=out)
+        self.assertIn("Отправлено: 1", out.getvalue())
+        self.assertIn("В очереди: 0", out.getvalue())
@@ -1,7 +1,6 @@
 import secrets
 
 from django.core import signing
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from rest_framework import generics
 from rest_framework.generics import CreateAPIView
@@ -11,8 +10,8 @@ from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from rest_framework.views import APIView
 
 from config import settings
-from config.settings import DEFAULT_FROM_EMAIL
 from users.models import User
+from users.outbox import enqueue_email
 from users.serializers import (
     PasswordResetConfirmSerializer,
     PasswordResetSerializer,
@@ -62,7 +61,7 @@ class UserRegisterAPIView(CreateAPIView):
     - Принимает email, пароль и другие данные пользователя.
     - Создаёт нового пользователя с полем `is_active=False`.
     - Генерирует токен для подтверждения email.
-    - Отправляет письмо со ссылкой для подтверждения email.
+    - Ставит в очередь письмо со ссылкой для подтверждения email.
     """
 
     serializer_class = UserSerializer
@@ -79,10 +78,9 @@ class UserRegisterAPIView(CreateAPIView):
         host = self.request.get_host()
         url = f"http://{host}/users/email-confirm/{user.token}/"
 
-        send_mail(
+        enqueue_email(
             subject="Подтверждение почты",
             message=f"Привет! Перейдите по ссылке для подтверждения почты: {url}",
-            from_email=DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
         )
 
@@ -132,7 +130,7 @@ class PasswordResetAPIView(APIView):
     Notes:
         - `uid` кодируется с использованием `django.core.signing` для безопасности.
         - Ссылка для сброса пароля формируется на основе настроек `PASSWORD_RESET_URL`.
-        - Email отправляется с использованием `django.core.mail.send_mail`.
+        - Email ставится в очередь `users.outbox` и отправляется задачей Celery.
     """
 
     permission_classes = (AllowAny,)
@@ -181,11 +179,10 @@ class PasswordResetAPIView(APIView):
         #     recipient_list=[user.email],
         # )
 
-        send_mail(
+        enqueue_email(
             subject=settings.PASSWORD_RESET_SETTINGS["PASSWORD_RESET_EMAIL_SUBJECT"],
             message=settings.PASSWORD_RESET_SETTINGS["PASSWORD_RESET_EMAIL_MESSAGE"]
             + f"{url}",
-            from_email=DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
         )
 